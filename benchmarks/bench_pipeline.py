@@ -0,0 +1,214 @@
+"""Time the pipeline's stages against recorded responses, optionally scaled up, and compare with a baseline.
+
+Record fixtures once (from the HTTP cache with --offline, or live)::
+
+    python benchmarks/bench_pipeline.py --record
+
+then benchmark, save a baseline and check later changes against it::
+
+    python benchmarks/bench_pipeline.py --scale 10 --save-baseline
+    python benchmarks/bench_pipeline.py --scale 10
+
+The check exits non-zero when a stage is slower than the baseline by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+import sqlalchemy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapepl import fbref, fetch, fpl, httpcache, instrumentation, loader, playernames  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(HERE, 'fixtures')
+BASELINE = os.path.join(HERE, 'baseline.json')
+# Stages compared against the baseline, summed over sources and tables
+CHECKED_STAGES = ('read_html', 'transform', 'match_players', 'load')
+
+
+def record_fixtures(directory, cache_dir, offline):
+    """Save bootstrap-static, the Understat league players and every FBRef page under ``directory``."""
+    cache = httpcache.ResponseCache(cache_dir)
+    payload, understat_players, fbref_html = asyncio.run(fetch.fetch_all(fbref.PAGES, cache=cache, offline=offline))
+    os.makedirs(os.path.join(directory, 'fbref'), exist_ok=True)
+    with open(os.path.join(directory, 'bootstrap-static.json'), 'w') as f:
+        json.dump(payload, f)
+    with open(os.path.join(directory, 'understat_players.json'), 'w') as f:
+        json.dump(understat_players, f)
+    for page, html in fbref_html.items():
+        with open(os.path.join(directory, 'fbref', f'{page}.html'), 'wb') as f:
+            f.write(html)
+    logger.info("Recorded %d FBRef pages, FPL and Understat into %s", len(fbref_html), directory)
+
+
+def load_fixtures(directory):
+    with open(os.path.join(directory, 'bootstrap-static.json')) as f:
+        payload = json.load(f)
+    with open(os.path.join(directory, 'understat_players.json')) as f:
+        understat_players = json.load(f)
+    fbref_html = {}
+    for page in fbref.PAGES:
+        with open(os.path.join(directory, 'fbref', f'{page}.html'), 'rb') as f:
+            fbref_html[page] = f.read()
+    return payload, understat_players, fbref_html
+
+
+def scale_fixtures(payload, understat_players, scale):
+    """Repeat FPL elements and Understat players ``scale`` times under new ids and names."""
+    if scale == 1:
+        return payload, understat_players
+    top = max(element['id'] for element in payload['elements'])
+    elements = [{**element, 'id': element['id'] + copy * top,
+                 'second_name': f"{element['second_name']} {copy}" if copy else element['second_name']}
+                for copy in range(scale) for element in payload['elements']]
+    players = [{**player, 'id': f"{player['id']}-{copy}" if copy else player['id'],
+                'player_name': f"{player['player_name']} {copy}" if copy else player['player_name']}
+               for copy in range(scale) for player in understat_players]
+    return {**payload, 'elements': elements}, players
+
+
+def read_scaled(html, spec, scale):
+    """read_html a table with its body rows repeated ``scale`` times, copies renamed so none are dropped."""
+    fragment = fbref.extract_table(html, spec.table_id)
+    if scale > 1:
+        start = fragment.index('<tbody>') + len('<tbody>')
+        end = fragment.rindex('</tbody>')
+        fragment = fragment[:start] + fragment[start:end] * scale + fragment[end:]
+    raw = pd.read_html(StringIO(fragment))[0]
+    if scale > 1:
+        names = raw.columns.droplevel(0) if raw.columns.nlevels > 1 else raw.columns
+        column = names.get_loc('Player' if spec.players else 'Squad')
+        copy = np.arange(len(raw)) // (len(raw) // scale)
+        raw.iloc[:, column] = raw.iloc[:, column].astype(str).where(copy == 0, raw.iloc[:, column].astype(str)
+                                                                    + ' ' + copy.astype(str))
+    return raw
+
+
+def run_once(fixtures, scale, db_url=None):
+    """One pass over every stage; returns the RunReport."""
+    payload, understat_players, fbref_html = fixtures
+    payload, understat_players = scale_fixtures(payload, understat_players, scale)
+    report = instrumentation.RunReport()
+
+    frames = {}
+    for page, html in fbref_html.items():
+        for spec in fbref.specs_for(page):
+            with report.stage('read_html', source='fbref', table=spec.name) as stage:
+                raw = read_scaled(html, spec, scale)
+                stage.rows_out = len(raw)
+            with report.stage('transform', source='fbref', table=spec.name, rows_in=len(raw)) as stage:
+                frames[spec.name] = fbref.transform(spec, raw)
+                stage.rows_out = len(frames[spec.name])
+    with report.stage('transform', source='fbref', table=fbref.FACTS_TABLE) as stage:
+        facts_df = fbref.player_season_facts(frames)
+        stage.rows_out = len(facts_df)
+    with report.stage('transform', source='fpl', table='players_fpl', rows_in=len(payload['elements'])) as stage:
+        players_df = fpl.players_frame(payload)
+        stage.rows_out = len(players_df)
+    understat_df = pd.DataFrame(understat_players)
+
+    with report.stage('match_players', table=playernames.MAP_TABLE, rows_in=len(players_df)) as stage:
+        player_map = playernames.build_player_map(players_df, understat_df, frames['playerstandard'])
+        stage.rows_out = len(player_map)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = sqlalchemy.create_engine(db_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        with loader.StagedLoad(engine) as staged:
+            staged.upsert(players_df, 'players_fpl', keys=['id'])
+            staged.upsert(understat_df, 'players_understat', keys=['id'])
+            for spec in fbref.TABLE_SPECS:
+                if spec.sql_table:
+                    staged.upsert(frames[spec.name], spec.sql_table, keys=spec.keys)
+            staged.upsert(facts_df, fbref.FACTS_TABLE, keys=['player_key'], indexes=[('Player',), ('Squad',)])
+            staged.upsert(player_map, playernames.MAP_TABLE, keys=['player_id'])
+        for result in staged.results:
+            report.record('load', table=result.table, seconds=result.seconds, rows_in=result.rows,
+                          rows_out=result.written)
+        engine.dispose()
+    return report
+
+
+def stage_totals(report):
+    totals = {}
+    for record in report.records:
+        totals[record.stage] = totals.get(record.stage, 0.0) + record.seconds
+    return totals
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    logger.setLevel(logging.INFO)
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', default=FIXTURES, help="recorded responses (default: %(default)s)")
+    parser.add_argument('--record', action='store_true', help="save fresh fixtures and exit")
+    parser.add_argument('--offline', action='store_true', help="with --record, take the responses from the HTTP cache")
+    parser.add_argument('--cache-dir', default='.cache/http', help="HTTP cache used by --record")
+    parser.add_argument('--scale', type=int, default=1, help="multiply player rows by this factor")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per stage, the fastest counts")
+    parser.add_argument('--db-url', help="load into this database instead of a temporary SQLite file")
+    parser.add_argument('--baseline', default=BASELINE, help="baseline timings (default: %(default)s)")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown per stage (default: 25%%)")
+    parser.add_argument('--report', help="write the fastest run's full per-table report as JSON here")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.fixtures, args.cache_dir, args.offline)
+        return 0
+
+    fixtures = load_fixtures(args.fixtures)
+    reports = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        reports.append(run_once(fixtures, args.scale, args.db_url))
+        logger.info("run %d: %.2fs", len(reports), time.perf_counter() - started)
+    totals = {stage: min(stage_totals(report)[stage] for report in reports) for stage in stage_totals(reports[0])}
+    if args.report:
+        fastest = min(reports, key=lambda report: sum(stage_totals(report).values()))
+        fastest.write_json(args.report)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['scale'] != args.scale:
+            logger.warning("Baseline was taken at --scale %d, not comparing", baseline['scale'])
+            baseline = None
+
+    failed = []
+    logger.info("%-16s %10s %10s %8s", 'stage', 'seconds', 'baseline', 'change')
+    for stage, seconds in totals.items():
+        line = f'{stage:<16} {seconds:10.3f}'
+        if baseline and stage in baseline['stages']:
+            change = seconds / baseline['stages'][stage] - 1
+            line += f" {baseline['stages'][stage]:10.3f} {change:+8.1%}"
+            if stage in CHECKED_STAGES and change > args.tolerance:
+                failed.append(stage)
+                line += '  REGRESSION'
+        logger.info("%s", line)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'scale': args.scale, 'stages': totals}, f, indent=2)
+        logger.info("Baseline saved to %s", args.baseline)
+    if failed:
+        logger.error("Slower than the baseline by more than %.0f%%: %s", args.tolerance * 100, ', '.join(failed))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,34 @@
+"""Scrape Premier League data from the FPL API, Understat and FBRef into MySQL.
+
+Importing the package is cheap: submodules, and pandas, aiohttp, SQLAlchemy and understat with
+them, are only imported on first use.
+"""
+import importlib
+
+# Public name -> submodule defining it
+_EXPORTS = {
+    'fetch_fpl': 'api',
+    'fetch_understat': 'api',
+    'fetch_fbref': 'api',
+    'create_engine': 'db',
+    'main': 'cli',
+}
+_SUBMODULES = ('api', 'backfill', 'changes', 'checkpoint', 'cli', 'db', 'derived', 'fbref', 'fetch', 'fpl',
+               'fplhistory', 'httpcache', 'instrumentation', 'loader', 'playernames', 'shots', 'snapshots')
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f'.{name}', __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS) | set(_SUBMODULES))
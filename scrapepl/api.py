@@ -0,0 +1,36 @@
+import asyncio
+
+# Dependencies are imported inside each function, so importing this module costs nothing
+
+
+async def _fetch(request, cache=None, offline=False):
+    import aiohttp
+
+    from . import fetch
+
+    async with aiohttp.ClientSession(connector=fetch.connector()) as session:
+        return await request(fetch.Fetcher(session, cache=cache, offline=offline))
+
+
+def fetch_fpl(columns=None, cache=None, offline=False):
+    """``players_fpl`` from bootstrap-static. ``columns`` as for ``fpl.players_frame``."""
+    from . import fetch, fpl
+
+    payload = asyncio.run(_fetch(lambda fetcher: fetcher.json(fetch.FPL_URL), cache, offline))
+    return fpl.players_frame(payload, columns=columns)
+
+
+def fetch_understat(season=2021, league='EPL', cache=None, offline=False):
+    """Understat league players for the season starting in ``season``."""
+    import pandas as pd
+
+    players = asyncio.run(_fetch(lambda fetcher: fetcher.understat_players(league, season), cache, offline))
+    return pd.DataFrame(players)
+
+
+def fetch_fbref(page, league='EPL', season=None, cache=None, offline=False):
+    """Every table on one FBRef stats page as ``{spec name: DataFrame}``. ``season`` None is the current one."""
+    from . import fbref, fetch
+
+    html = asyncio.run(_fetch(lambda fetcher: fetcher.read(fetch.fbref_url(page, league, season)), cache, offline))
+    return fbref.transform_page(html, fbref.specs_for(page))
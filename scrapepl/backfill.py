@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import logging
+import time
+
+import aiohttp
+import pandas as pd
+
+from . import cli, db, fbref, fetch, httpcache, loader
+from .checkpoint import Checkpoint
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT = '.state/backfill.json'
+# League/season cells fetched at once
+CELL_CONCURRENCY = 2
+# Requests per second per source. FBRef blocks clients making more than about 20 requests a minute.
+RATE_LIMITS = {'fbref.com': 0.3, 'understat.com': 2.0}
+HISTORY_SUFFIX = '_history'
+# FBRef's advanced stats pages, and xG in the standard tables, start with 2017-2018
+FIRST_SEASON = 2017
+
+
+def load_cell(engine, writer, league, season, understat_players, frames):
+    """Append one cell's Understat and FBRef tables to their ``_history`` tables, keyed by league and season."""
+    tables = [(pd.DataFrame(understat_players), 'players_understat', ('id',))]
+    tables += [(frames[spec.name], spec.sql_table, spec.keys) for spec in fbref.TABLE_SPECS
+               if spec.sql_table and spec.name in frames]
+    rows = 0
+    for df, table, keys in tables:
+        df.insert(0, 'league', league)
+        df.insert(1, 'season', season)
+        # FBRef adds and renames columns between seasons, so tables only ever gain columns
+        result = loader.append(engine, df, table + HISTORY_SUFFIX, ('league', 'season', *keys), writer,
+                               add_columns=True)
+        rows += result.written
+    return rows
+
+
+async def backfill(engine, leagues, seasons, pages=fbref.PAGES, cache=None, concurrency=CELL_CONCURRENCY,
+                   checkpoint_path=CHECKPOINT):
+    """Run fetch -> parse -> load for every league x season cell not already in the checkpoint.
+
+    At most ``concurrency`` cells are in flight; requests share one Fetcher rate limited per source
+    by ``RATE_LIMITS``. A failed cell is logged and left out of the checkpoint so the next run
+    retries it. Returns the failed cells.
+    """
+    checkpoint = Checkpoint(checkpoint_path, 'backfill')
+    cells = [(league, season) for league in leagues for season in seasons
+             if f'{league}/{season}' not in checkpoint.done]
+    logger.info("Backfilling %d cells, %d already done", len(cells), len(leagues) * len(seasons) - len(cells))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    # Loads are quick next to the rate limited fetches; one at a time keeps SQLite and the writer simple
+    load_lock = asyncio.Lock()
+    writer = loader.default_writer(engine)
+    failed = []
+    started = time.perf_counter()
+
+    async with aiohttp.ClientSession(connector=fetch.connector()) as session:
+        fetcher = fetch.Fetcher(session, cache=cache, rate_limits=RATE_LIMITS)
+
+        async def run(league, season):
+            async with semaphore:
+                cell_started = time.perf_counter()
+                try:
+                    understat_players, *html = await asyncio.gather(
+                        fetcher.understat_players(league, season),
+                        *(fetcher.read(fetch.fbref_url(page, league, season)) for page in pages),
+                    )
+                    # Parsed in this thread: forking a pool from a threaded process can deadlock
+                    frames = await asyncio.to_thread(fbref.parse_pages, dict(zip(pages, html)), workers=1)
+                    async with load_lock:
+                        rows = await asyncio.to_thread(load_cell, engine, writer, league, season,
+                                                       understat_players, frames)
+                except Exception as error:
+                    logger.error("%s %d failed: %s", league, season, error)
+                    failed.append((league, season))
+                    return
+            checkpoint.add([f'{league}/{season}'])
+            logger.info("%s %d: %d rows in %.1fs", league, season, rows, time.perf_counter() - cell_started)
+
+        await asyncio.gather(*(run(league, season) for league, season in cells))
+
+    logger.info("Backfill finished: %d cells loaded, %d failed, %d requests in %.1fs", len(cells) - len(failed),
+                len(failed), fetcher.requests, time.perf_counter() - started)
+    return failed
+
+
+def parse_seasons(value):
+    """'2017-2021' for a range of starting years, or a comma separated list."""
+    if '-' in value:
+        first, last = value.split('-')
+        return list(range(int(first), int(last) + 1))
+    return [int(season) for season in value.split(',')]
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Load past seasons of Understat and FBRef data into *_history tables")
+    parser.add_argument('--leagues', default='EPL', type=lambda value: value.split(','),
+                        help=f"comma separated, any of {', '.join(fetch.LEAGUES)} (default: %(default)s)")
+    parser.add_argument('--seasons', required=True, type=parse_seasons,
+                        help="starting years, e.g. 2017-2021 or 2019,2021")
+    cli.add_common_arguments(parser)
+    parser.add_argument('--concurrency', type=int, default=CELL_CONCURRENCY, help="cells fetched at once")
+    parser.add_argument('--restart', action='store_true', help="forget finished cells and load everything again")
+    args = parser.parse_args()
+    unknown = set(args.leagues) - set(fetch.LEAGUES)
+    if unknown:
+        parser.error(f"unknown leagues: {', '.join(sorted(unknown))}")
+    if min(args.seasons) < FIRST_SEASON:
+        parser.error(f"FBRef has no advanced stats before {FIRST_SEASON}-{FIRST_SEASON + 1}, "
+                     f"--seasons must start at {FIRST_SEASON} or later")
+
+    if args.restart:
+        Checkpoint(CHECKPOINT, 'backfill').clear()
+    cache = None if args.no_cache else httpcache.ResponseCache(args.cache_dir)
+    engine = db.create_engine(args.db_url, args.dbcreds)
+    failed = asyncio.run(backfill(engine, args.leagues, args.seasons, cache=cache, concurrency=args.concurrency))
+    if failed:
+        raise SystemExit(f"{len(failed)} cells failed: {', '.join(f'{league} {season}' for league, season in failed)}")
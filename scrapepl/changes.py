@@ -0,0 +1,62 @@
+import hashlib
+import json
+import logging
+import os
+
+from . import fbref
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = '.state/payload_hashes.json'
+# bootstrap-static keys read by fpl.players_frame; the rest (events, chip counts...) changes without affecting it
+FPL_KEYS = ('elements', 'element_types', 'teams')
+
+
+def json_digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+
+def fpl_digest(payload):
+    return json_digest({key: payload[key] for key in FPL_KEYS})
+
+
+def fbref_digest(html, page):
+    """Hash of just the page's stats tables, so ads, timestamps and scripts elsewhere on the page don't count."""
+    digest = hashlib.sha256()
+    for spec in fbref.specs_for(page):
+        try:
+            digest.update(fbref.extract_table(html, spec.table_id).encode())
+        except ValueError:
+            # A missing table is reported when the page is parsed
+            digest.update(spec.table_id.encode())
+    return digest.hexdigest()
+
+
+class PayloadHashes:
+    """Hash of each source's payload as of the last run that loaded it.
+
+    Sources are named ``fpl``, ``understat`` and ``fbref/<page>``. ``update`` rewrites the file atomically,
+    and is only called once the payloads are loaded, so a failed load is retried on the next run.
+    """
+
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.hashes = json.load(f)
+        except (OSError, ValueError):
+            self.hashes = {}
+
+    def changed(self, digests):
+        """Names in ``digests`` (name -> hash) whose hash differs from the last loaded one."""
+        return {name for name, digest in digests.items() if self.hashes.get(name) != digest}
+
+    def update(self, digests):
+        if not digests:
+            return
+        self.hashes.update(digests)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.hashes, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
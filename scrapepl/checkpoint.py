@@ -0,0 +1,33 @@
+import json
+import os
+
+
+class Checkpoint:
+    """Work items already finished for one ``run``, so an interrupted run picks up where it stopped.
+
+    The set is rewritten atomically after every ``add``. A file left by a different run is stale and ignored.
+    """
+
+    def __init__(self, path, run):
+        self.path = path
+        self.run = run
+        self.done = set()
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = None
+        if state and state.get('run') == run:
+            self.done = set(state['done'])
+
+    def add(self, ids):
+        self.done.update(ids)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'run': self.run, 'done': sorted(self.done)}, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
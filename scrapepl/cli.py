@@ -0,0 +1,319 @@
+import argparse
+import json
+import logging
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+# Understat season, by starting year
+UNDERSTAT_SEASON = 2021
+# Processes used to parse the FBRef pages, None uses every core
+PARSE_WORKERS = None
+# Sources --sources can pick from
+SOURCES = ('fpl', 'understat', 'fbref')
+
+
+def comma_list(value):
+    return [name for name in value.split(',') if name]
+
+
+def add_common_arguments(parser):
+    """Database and HTTP cache options shared by every command."""
+    parser.add_argument('--db-url',
+                        help=f"SQLAlchemy database URL (default: ${db.DB_URL_ENV}, else the credentials file)")
+    parser.add_argument('--dbcreds',
+                        help=f"database credentials JSON (default: ${db.DBCREDS_ENV} or {db.DBCREDS_FILE})")
+    parser.add_argument('--no-cache', action='store_true', help="don't read or write the HTTP cache")
+    parser.add_argument('--cache-dir', default='.cache/http', help="HTTP cache directory (default: %(default)s)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m scrapepl",
+                                     description="Scrape FPL, Understat and FBRef data into MySQL")
+    add_common_arguments(parser)
+    parser.add_argument('--sources', type=comma_list, default=list(SOURCES),
+                        help=f"comma separated, any of {', '.join(SOURCES)} (default: all)")
+    parser.add_argument('--pages', type=comma_list,
+                        help="FBRef pages to scrape, comma separated, e.g. stats,shooting (default: all)")
+    parser.add_argument('--changed-only', action='store_true',
+                        help="skip parsing and loading sources whose payload hasn't changed since the last load")
+    parser.add_argument('--hash-file', help="payload hashes of the last load (default: .state/payload_hashes.json)")
+    parser.add_argument('--offline', action='store_true',
+                        help="replay the run from the HTTP cache without network access")
+    parser.add_argument('--cache-ttl-days', type=float, default=30, help="evict cached responses older than this")
+    parser.add_argument('--cache-max-mb', type=float, default=500,
+                        help="evict least recently used responses above this size")
+    parser.add_argument('--fpl-columns', type=lambda value: value if value == 'all' else value.split(','),
+                        help="extra bootstrap-static element fields to keep in players_fpl, comma separated, or 'all'")
+    parser.add_argument('--no-fpl-history', action='store_true',
+                        help="skip the per-gameweek players_fpl_history stage")
+    parser.add_argument('--snapshot-dir', help="directory of the dated Parquet snapshots (default: snapshots)")
+    parser.add_argument('--no-snapshot', action='store_true',
+                        help="don't write this run's frames to a Parquet snapshot")
+    parser.add_argument('--report', default='.state/run_report.json',
+                        help="JSON run report path (default: %(default)s)")
+    parser.add_argument('--prometheus', help="also write the run report in Prometheus text format to this file")
+    parser.add_argument('--no-shots', action='store_true',
+                        help="skip loading new Understat match shots into shots_understat")
+    parser.add_argument('--derived-metrics',
+                        help="JSON file of {name: expression} to compute into player_derived instead of the defaults")
+    return parser
+
+
+def run(args):
+    """Download, transform, match player names and load, per ``build_parser``'s options.
+
+    Only the selected sources and FBRef pages are fetched. With ``--changed-only`` a source whose
+    payload hash matches the last load is neither parsed nor loaded. A source that fails to download
+    or parse is skipped and the rest still load, as are FPL players and Understat matches whose
+    history or shots can't be fetched. A failed player match, load or snapshot is recorded and the
+    stages after it still run. The run report is written however the run ends. Returns the
+    ``RunReport``, which lists the failures.
+    """
+    from . import instrumentation
+
+    # Wall time, bytes, memory and rows of every stage, per source and table
+    report = instrumentation.RunReport()
+    try:
+        _run(args, report)
+    except Exception as error:
+        report.fail('run', error)
+        raise
+    finally:
+        report.write_json(args.report)
+        if args.prometheus:
+            report.write_prometheus(args.prometheus)
+        if report.failures:
+            logger.error("Finished with %d failures: %s", len(report.failures),
+                         ', '.join(failure.source or failure.table or failure.stage for failure in report.failures))
+    return report
+
+
+def _run(args, report):
+    # Imported here so `import scrapepl` and --help don't pay for pandas, aiohttp and SQLAlchemy
+    import asyncio
+
+    import pandas as pd
+
+    from . import changes, derived, fbref, fetch, fpl, fplhistory, httpcache, loader, playernames, shots, snapshots
+
+    engine = db.create_engine(args.db_url, args.dbcreds)
+
+    cache = None
+    if not args.no_cache:
+        cache = httpcache.ResponseCache(args.cache_dir, ttl=args.cache_ttl_days * 24 * 3600,
+                                        max_bytes=args.cache_max_mb * 1024 ** 2)
+
+    # Download everything up front: FPL, Understat and all FBRef pages share one pooled session
+    # A source that fails is skipped and listed in the report, the others are still loaded
+    pages = (args.pages or fbref.PAGES) if 'fbref' in args.sources else []
+    failures = {}
+    with report.stage('download'):
+        payload, understat_players, fbref_html = asyncio.run(
+            fetch.fetch_all(pages, season=UNDERSTAT_SEASON, cache=cache, offline=args.offline, report=report,
+                            fpl='fpl' in args.sources, understat='understat' in args.sources, failures=failures))
+    for source, error in failures.items():
+        report.fail('download', error, source=source)
+    if cache is not None and not args.offline:
+        cache.prune()
+
+    # Hash every payload; with --changed-only the ones that match the last load are dropped here
+    hashes = changes.PayloadHashes(args.hash_file or changes.STATE_FILE)
+    digests = {f'fbref/{page}': changes.fbref_digest(html, page) for page, html in fbref_html.items()}
+    if payload is not None:
+        digests['fpl'] = changes.fpl_digest(payload)
+    if understat_players is not None:
+        digests['understat'] = changes.json_digest(understat_players)
+    if args.changed_only:
+        changed = hashes.changed(digests)
+        unchanged = sorted(set(digests) - changed)
+        if unchanged:
+            logger.info("Unchanged since the last load, skipping: %s", ', '.join(unchanged))
+        digests = {name: digest for name, digest in digests.items() if name in changed}
+        payload = payload if 'fpl' in digests else None
+        understat_players = understat_players if 'understat' in digests else None
+        changed_pages = [page for page in fbref_html if f'fbref/{page}' in digests]
+        # player_season_facts joins every player table, so one changed player page means parsing them all
+        player_pages = {spec.page for spec in fbref.TABLE_SPECS if spec.players}
+        if not player_pages.intersection(changed_pages) or not player_pages.issubset(fbref_html):
+            fbref_html = {page: fbref_html[page] for page in changed_pages}
+
+    # FPL Site Data
+    players_df = None
+    if payload is not None:
+        logger.info("Processing FPL site data")
+        with report.stage('transform', source='fpl', table='players_fpl',
+                          rows_in=len(payload['elements'])) as stage:
+            players_df = fpl.players_frame(payload, columns=args.fpl_columns)
+            stage.rows_out = len(players_df)
+
+    # Understat Data
+    playersunderstat_df = None
+    if understat_players is not None:
+        with report.stage('transform', source='understat', table='players_understat',
+                          rows_in=len(understat_players)) as stage:
+            playersunderstat_df = pd.DataFrame(understat_players)
+            stage.rows_out = len(playersunderstat_df)
+
+    # FBRef Data
+    fbref_frames = {}
+    if fbref_html:
+        logger.info("Processing FBRef site data")
+        parse_failures = {}
+        with report.stage('parse', source='fbref') as stage:
+            fbref_frames = fbref.parse_pages(fbref_html, workers=PARSE_WORKERS, report=report,
+                                             failures=parse_failures)
+            stage.bytes = sum(map(len, fbref_html.values()))
+            stage.rows_out = sum(map(len, fbref_frames.values()))
+        for page, error in parse_failures.items():
+            report.fail('parse', error, source=f'fbref/{page}')
+            # Unparsed, so it has to count as changed next time
+            digests.pop(f'fbref/{page}', None)
+    # The facts table joins every player table, so it's only rebuilt when all of them were parsed
+    facts_df = None
+    if all(spec.name in fbref_frames for spec in fbref.TABLE_SPECS if spec.players):
+        with report.stage('transform', source='fbref', table=fbref.FACTS_TABLE) as stage:
+            facts_df = fbref.player_season_facts(fbref_frames)
+            stage.rows_out = len(facts_df)
+    elif fbref_frames:
+        logger.info("Not all FBRef player pages were parsed, %s left as it is", fbref.FACTS_TABLE)
+
+    # Shares of team totals, per-shot and per-90 rates, computed once here rather than by every dashboard query
+    derived_df = reconciled_df = None
+    if facts_df is not None and {'teamstandard', 'opponentstandard'}.issubset(fbref_frames):
+        metrics = None
+        if args.derived_metrics:
+            with open(args.derived_metrics) as f:
+                metrics = json.load(f)
+        metric_failures = {}
+        with report.stage('transform', source='fbref', table=derived.DERIVED_TABLE, rows_in=len(facts_df)) as stage:
+            derived_df = derived.derive(facts_df, fbref_frames['teamstandard'], fbref_frames['opponentstandard'],
+                                        metrics=metrics, failures=metric_failures)
+            stage.rows_out = len(derived_df)
+        for name, error in metric_failures.items():
+            report.fail('transform', error, source='fbref', table=f'{derived.DERIVED_TABLE}.{name}')
+        with report.stage('reconcile', source='fbref', table=derived.RECONCILE_TABLE) as stage:
+            reconciled_df = derived.reconcile(facts_df, fbref_frames['teamstandard'])
+            stage.rows_out = len(reconciled_df)
+
+    # Player names differ between sources, resolve them all to FPL players. Only new or unmatched players are matched.
+    player_map = last_player_id = None
+    if players_df is not None and playersunderstat_df is not None and 'playerstandard' in fbref_frames:
+        logger.info("Matching player names across sources")
+        try:
+            with report.stage('match_players', table=playernames.MAP_TABLE, rows_in=len(players_df)) as stage:
+                last_player_id = playernames.read_last_player_id(engine)
+                player_map = playernames.build_player_map(players_df, playersunderstat_df,
+                                                          fbref_frames['playerstandard'],
+                                                          previous=playernames.read_player_map(engine),
+                                                          last_id=last_player_id)
+                stage.rows_out = len(player_map)
+        except Exception as error:
+            logger.error("Matching player names failed, %s left as it is: %r", playernames.MAP_TABLE, error)
+            report.fail('match_players', error, table=playernames.MAP_TABLE)
+            player_map = None
+
+    # Everything is written to staging tables and swapped in together, so readers never see a half-updated DB
+    logger.info("Saving site data")
+    try:
+        with report.stage('load'):
+            with loader.StagedLoad(engine) as staged:
+                if players_df is not None:
+                    staged.upsert(players_df, 'players_fpl', keys=['id'])
+                if playersunderstat_df is not None:
+                    staged.upsert(playersunderstat_df, 'players_understat', keys=['id'])
+                for spec in fbref.TABLE_SPECS:
+                    if spec.sql_table and spec.name in fbref_frames:
+                        staged.upsert(fbref_frames[spec.name], spec.sql_table, keys=spec.keys)
+                # Every player table in one wide row per player, joined on an integer key instead of the Player text
+                if facts_df is not None:
+                    staged.upsert(facts_df, fbref.FACTS_TABLE, keys=['player_key'], indexes=[('Player',), ('Squad',)])
+                if player_map is not None:
+                    staged.upsert(player_map, playernames.MAP_TABLE, keys=['player_id'])
+                    staged.upsert(playernames.last_id_frame(player_map, last_player_id), playernames.LAST_ID_TABLE,
+                                  keys=['sequence'])
+                if derived_df is not None:
+                    staged.upsert(derived_df, derived.DERIVED_TABLE, keys=['player_key'], indexes=[('Squad',)])
+                    staged.upsert(reconciled_df, derived.RECONCILE_TABLE, keys=['Team', 'stat'])
+    except Exception as error:
+        # The staged tables are discarded, so the live ones still hold the last complete load
+        logger.error("Loading failed, the database is left as it was: %r", error)
+        report.fail('load', error)
+    else:
+        for result in staged.results:
+            report.record('load', table=result.table, seconds=result.seconds, rows_in=result.rows,
+                          rows_out=result.written)
+        # Only payloads that made it into the database count as loaded
+        hashes.update(digests)
+
+    # Keep a dated copy of every frame, the tables above only ever hold the latest week
+    frames = {
+        'players_fpl': players_df,
+        'players_understat': playersunderstat_df,
+        **{spec.sql_table or spec.name: fbref_frames.get(spec.name) for spec in fbref.TABLE_SPECS},
+        playernames.MAP_TABLE: player_map,
+        derived.DERIVED_TABLE: derived_df,
+        derived.RECONCILE_TABLE: reconciled_df,
+    }
+    frames = {name: df for name, df in frames.items() if df is not None}
+    if frames and not args.no_snapshot:
+        try:
+            with report.stage('snapshot', rows_in=sum(map(len, frames.values()))):
+                snapshots.write_snapshot(frames, directory=args.snapshot_dir or snapshots.SNAPSHOT_DIR)
+        except Exception as error:
+            logger.error("Writing the snapshot failed: %r", error)
+            report.fail('snapshot', error)
+
+    # Per-gameweek history is appended to rather than replaced, so it is loaded on its own outside the swap
+    if payload is not None and not args.no_fpl_history:
+        logger.info("Saving FPL gameweek history")
+        history_failures = {}
+        try:
+            with report.stage('fpl_history', source='fpl', table=fplhistory.HISTORY_TABLE,
+                              rows_in=len(players_df)) as stage:
+                summary = asyncio.run(fplhistory.load_history(
+                    engine, players_df['id'].tolist(), fplhistory.season_of(payload),
+                    fplhistory.current_event(payload), cache=cache, offline=args.offline, failures=history_failures))
+                stage.rows_out = summary['rows']
+                stage.bytes = summary['bytes']
+        except Exception as error:
+            logger.error("Loading FPL history failed, skipping it: %r", error)
+            report.fail('fpl_history', error, source='fpl', table=fplhistory.HISTORY_TABLE)
+        for player_id, error in history_failures.items():
+            report.fail('fpl_history', error, source=f'fpl/element-summary/{player_id}', table=fplhistory.HISTORY_TABLE)
+
+    # Shots of matches not loaded yet, streamed into shots_understat
+    if understat_players is not None and not args.no_shots:
+        logger.info("Saving Understat shots")
+        shot_failures = {}
+        try:
+            with report.stage('shots', source='understat', table=shots.SHOTS_TABLE) as stage:
+                stage.rows_out = asyncio.run(shots.load_shots(engine, 'EPL', [UNDERSTAT_SEASON], cache=cache,
+                                                              offline=args.offline, failures=shot_failures))
+        except Exception as error:
+            logger.error("Loading Understat shots failed, skipping them: %r", error)
+            report.fail('shots', error, source='understat', table=shots.SHOTS_TABLE)
+        for key, error in shot_failures.items():
+            report.fail('shots', error, source=f'understat/{key}', table=shots.SHOTS_TABLE)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger().setLevel(logging.INFO)
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.offline and args.no_cache:
+        parser.error("--offline replays from the cache, it can't be combined with --no-cache")
+    unknown = sorted(set(args.sources) - set(SOURCES))
+    if unknown:
+        parser.error(f"unknown --sources {', '.join(unknown)}, choose from {', '.join(SOURCES)}")
+    if args.pages:
+        from . import fbref
+
+        unknown = sorted(set(args.pages) - set(fbref.PAGES))
+        if unknown:
+            parser.error(f"unknown --pages {', '.join(unknown)}, choose from {', '.join(fbref.PAGES)}")
+    # Non-zero when anything was skipped, so cron and CI notice a partial run
+    return 1 if run(args).failures else 0
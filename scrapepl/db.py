@@ -0,0 +1,34 @@
+import json
+import os
+
+# A full SQLAlchemy URL in this variable wins over everything else
+DB_URL_ENV = 'SCRAPEPL_DB_URL'
+# Path of the credentials file, {"mysql": {"user": ..., "password": ..., "host": ...}}
+DBCREDS_ENV = 'SCRAPEPL_DBCREDS'
+DBCREDS_FILE = 'dbcreds.json'
+DATABASE_NAME = 'premierleague'
+
+
+def read_dbcreds(path=None):
+    path = path or os.environ.get(DBCREDS_ENV, DBCREDS_FILE)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"No database credentials: set {DB_URL_ENV}, or put them in {path} "
+                                f"(or the file named by {DBCREDS_ENV})") from None
+
+
+def create_engine(url=None, dbcreds_path=None):
+    """Engine for ``url``, else ``$SCRAPEPL_DB_URL``, else MySQL from the credentials file."""
+    import sqlalchemy
+
+    url = url or os.environ.get(DB_URL_ENV)
+    if url is None:
+        creds = read_dbcreds(dbcreds_path)['mysql']
+        url = sqlalchemy.engine.URL.create('mysql+mysqlconnector', username=creds['user'],
+                                           password=creds['password'], host=creds['host'], database=DATABASE_NAME)
+    url = sqlalchemy.engine.make_url(url)
+    # Bulk loads go through LOAD DATA LOCAL INFILE
+    connect_args = {'allow_local_infile': True} if url.get_backend_name() == 'mysql' else {}
+    return sqlalchemy.create_engine(url, connect_args=connect_args)
@@ -0,0 +1,99 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DERIVED_TABLE = 'player_derived'
+RECONCILE_TABLE = 'team_reconciliation'
+
+# Metric name -> DataFrame.eval expression, evaluated on every row of player_season_facts. Player stats
+# go by their column name (backticks around names like `90s`), the player's squad total of a stat by
+# squad_<stat>, and the team tables' columns by team_<column> (teamstandard) and opp_<column> (opponentstandard).
+DERIVED_METRICS = {
+    'GoalShare': 'Goals / team_Goals',
+    'AssistShare': 'Assists / team_Assists',
+    'xGShare': 'xG / team_xG',
+    'npxGShare': 'npxG / team_npxG',
+    'xAShare': 'xA / team_xA',
+    'ShotShare': 'ShotsTotal / squad_ShotsTotal',
+    'MinsShare': 'Min / squad_Min',
+    'xGPerShot': 'xG / ShotsTotal',
+    'Goals-xG': 'Goals - xG',
+    'npxGI90': '(npxG + xA) / `90s`',
+    'TeamxGcWhileOnPitch': 'xTeamGConPitch / opp_xGc',
+}
+
+# Player stats whose squad total should equal the team table's. Goals aren't here: team goals include own goals.
+RECONCILE_STATS = ('Assists', 'Penalties', 'CardsYellow', 'CardsRed', 'xG', 'npxG', 'xA')
+# FBRef labels the rows of the squads-against table 'vs Arsenal', 'vs Chelsea', ...
+OPPONENT_PREFIX = r'^vs '
+# FBRef rounds expected stats to 0.1, so each player's value may be off by this much
+ROUNDING = 0.05
+
+
+def squad_frame(facts, teams, opponents):
+    """Every numeric player column as float64, next to its squad total and the squad's team table rows."""
+    players = facts.drop(columns='player_key').select_dtypes('number').astype('float64')
+    squad_totals = players.groupby(facts['Squad']).transform('sum').add_prefix('squad_')
+    team = teams.set_index('Team').select_dtypes('number').astype('float64')
+    opponent = opponents.set_index(opponents['Team'].str.replace(OPPONENT_PREFIX, '', regex=True))
+    opponent = opponent.select_dtypes('number').astype('float64')
+    team_rows = pd.concat([team.add_prefix('team_'), opponent.add_prefix('opp_')], axis=1)
+    team_rows = team_rows.reindex(facts['Squad']).set_axis(facts.index)
+    return pd.concat([players, squad_totals, team_rows], axis=1)
+
+
+def derive(facts, teams, opponents, metrics=None, failures=None):
+    """``player_derived``: ``metrics`` (name -> expression, default ``DERIVED_METRICS``) for every player.
+
+    Expressions are evaluated once per run over whole columns. Divisions by zero give NULL rather
+    than infinity. An expression that fails raises, unless a ``failures`` dict is passed: the metric
+    is then left out and its exception stored under the metric name.
+    """
+    frame = squad_frame(facts, teams, opponents)
+    derived = facts[['player_key', 'Player', 'Squad']].copy()
+    for name, expression in (metrics or DERIVED_METRICS).items():
+        try:
+            values = frame.eval(expression)
+        except Exception as error:
+            if failures is None:
+                raise
+            logger.error("Derived metric %s = %s failed, skipping it: %r", name, expression, error)
+            failures[name] = error
+            continue
+        derived[name] = values.replace([np.inf, -np.inf], np.nan).astype('float32')
+    return derived
+
+
+def reconcile(facts, teams, stats=RECONCILE_STATS):
+    """Compare each squad's summed player stats with its team table row, one row per team and stat.
+
+    ``reconciled`` is False where the two differ by more than player rounding can explain, as when a
+    player who moved within the league only counts for one of their clubs.
+    """
+    stats = [stat for stat in stats if stat in facts.columns and stat in teams.columns]
+    players = facts[stats].astype('float64').groupby(facts['Squad']).sum()
+    counts = facts.groupby('Squad').size()
+    team = teams.set_index('Team')[stats].astype('float64')
+    rows = []
+    for stat in stats:
+        exact = pd.api.types.is_integer_dtype(facts[stat].dtype)
+        rows.append(pd.DataFrame({
+            'Team': team.index,
+            'stat': stat,
+            'players_total': players[stat].reindex(team.index).fillna(0).to_numpy(),
+            'team_total': team[stat].to_numpy(),
+            'tolerance': 0.0 if exact else counts.reindex(team.index).fillna(0).to_numpy() * ROUNDING,
+        }))
+    result = pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(
+        columns=['Team', 'stat', 'players_total', 'team_total', 'tolerance'])
+    result['difference'] = result['players_total'] - result['team_total']
+    # A little slack on top of the tolerance for float sums
+    result['reconciled'] = result['difference'].abs() <= result['tolerance'] + 1e-6
+    mismatched = result[~result['reconciled']]
+    if len(mismatched):
+        logger.warning("%d team totals don't match the sum over their players: %s", len(mismatched),
+                       ', '.join(f'{row.Team} {row.stat} ({row.difference:+g})' for row in mismatched.itertuples()))
+    return result
@@ -0,0 +1,473 @@
+import logging
+import multiprocessing
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columns every player table drops before renaming
+PLAYER_DROP = ('Matches', 'Rk', 'Nation', 'Pos', 'Age', 'Born', '90s')
+
+# Columns kept as text ('Age' is years-days); every other column is a stat
+TEXT_COLUMNS = ('Player', 'Nation', 'Pos', 'Squad', 'Team', 'Age')
+# Stat names for rates, averages and expected values, which are float32. Other stats are counts.
+FLOAT_STAT = re.compile(r'90|%|Percentage|Per|Avg|Average|xG|xA|/|PostShot|^x|^npx')
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """How to turn one table on an FBRef stats page into a frame for the DB.
+
+    ``table_id`` is the id of the ``<table>`` element on the page. Player tables get the
+    mid-table header rows and intraleague transfer duplicates removed,
+    repeated column names are suffixed 1, 2, ... and then renamed. Team tables are renamed
+    positionally through ``columns``. ``keys`` is the primary key of the SQL table.
+    """
+    name: str
+    page: str
+    table_id: str
+    drop: tuple
+    rename: dict = None
+    columns: tuple = None
+    sql_table: str = None
+    players: bool = True
+    keys: tuple = ('Player', 'Squad')
+
+
+TABLE_SPECS = [
+    TableSpec(
+        name='teamstandard', page='stats', table_id='stats_squads_standard_for', sql_table='teamstandard',
+        players=False, keys=('Team',),
+        drop=('# Pl', 'Age', 'Poss', 'MP', 'Starts', 'Min', '90s', 'PKatt'),
+        columns=('Team', 'Goals', 'Assists', 'npGoals', 'Penalties', 'CardsYellow', 'CardsRed', 'Goals90',
+                 'Assists90', 'GI90', 'npGoals90', 'npGI90', 'xG', 'npxG', 'xA', 'npxGI', 'xG90', 'xA90',
+                 'xGI90', 'npxG90', 'npxGI90'),
+    ),
+    TableSpec(
+        name='opponentstandard', page='stats', table_id='stats_squads_standard_against', sql_table='opponentstandard',
+        players=False, keys=('Team',),
+        drop=('# Pl', 'Age', 'Poss', 'MP', 'Starts', 'Min', '90s', 'PKatt', 'xA'),
+        columns=('Team', 'Goals', 'Assists', 'npGoals', 'Penalties', 'CardsYellow', 'CardsRed', 'Goals90',
+                 'Assists90', 'GI90', 'npGoals90', 'npGIc90', 'xGc', 'npxGc', 'npxGIc', 'xGc90', 'xGIc90',
+                 'npxGc90', 'npxGIc90'),
+    ),
+    TableSpec(
+        name='playerstandard', page='stats', table_id='stats_standard', sql_table='playerstandard',
+        drop=('Matches', 'Rk', 'Born'),
+        rename={
+            'Gls': 'Goals',
+            'Ast': 'Assists',
+            'G-PK': 'npGoals',
+            'PK': 'Penalties',
+            'PKAtt': 'PenaltyAttempts',
+            'CrdY': 'CardsYellow',
+            'CrdR': 'CardsRed',
+            'Gls1': 'G90',
+            'Ast1': 'A90',
+            'G+A': 'GI90',
+            'G+A-PK': 'npGI90',
+            'G-PK1': 'npG90',
+            'xG1': 'xG90',
+            'xA1': 'xA90',
+            'xG+xA': 'xGI90',
+            'npxG1': 'npxG90',
+            'npxG+xA1': 'npxGI90',
+        },
+    ),
+    TableSpec(
+        name='playersMisc', page='misc', table_id='stats_misc', sql_table='playersMisc',
+        drop=PLAYER_DROP + ('CrdY', 'CrdR', 'Crs', 'Int', 'TklW', '2CrdY'),
+        rename={
+            'Fls': 'FoulsCommitted',
+            'Fld': 'FoulsDrawn',
+            'Off': 'Offsides',
+            'PKwon': 'PenaltiesWon',
+            'PKcon': 'PenaltiesConceded',
+            'Recov': 'BallsRecovered',
+            'OG': 'OwnGoals',
+            'Won': 'AerialsWon',
+            'Lost': 'AerialsLost',
+            'Won%': 'AerialPercentage',
+        },
+    ),
+    TableSpec(
+        name='playingtime', page='playingtime', table_id='stats_playing_time', sql_table='playingtime',
+        drop=PLAYER_DROP + ('MP', 'Starts', 'Compl', 'Min', 'PPM'),
+        rename={
+            'Mn/MP': 'MinsPerMatch',
+            'Min%': 'MinsPercentage',
+            'Mn/Start': 'MinsPerStart',
+            'Mn/Sub': 'MinsPerSub',
+            'unSub': 'Benched',
+            'onG': 'TeamGonPitch',
+            'onGA': 'TeamGConPitch',
+            '+/-': 'TeamG-TeamGConPitch',
+            '+/-90': 'TeamG-TeamGConPitch90',
+            'On-Off': 'TeamGonPitch-TeamGNotonPitch90',
+            'onxG': 'xTeamGonPitch',
+            'onxGA': 'xTeamGConPitch',
+            'xG+/-': 'xTeamG-xTeamGConPitch',
+            'xG+/-90': 'xTeamG-xTeamGConPitch90',
+            'On-Off1': 'xTeamGonPitch-xTeamGNotonPitch90',
+        },
+    ),
+    TableSpec(
+        name='defensivestats', page='defense', table_id='stats_defense', sql_table='defensivestats',
+        drop=PLAYER_DROP,
+        rename={
+            'Tkl': 'TackledPlayers',
+            'TklW': 'TacklesWinBall',
+            'Def 3rd': 'TacklesDefThird',
+            'Mid 3rd': 'TacklesMidThird',
+            'Att 3rd': 'TacklesAttThird',
+            'Tkl1': 'DriblersTackled',
+            'Att': 'Dribbles+TacklesLost',
+            'Tkl%': 'DribblersTackledPercentage',
+            'Past': 'DribbledPast',
+            'Press': 'Presses',
+            'Succ': 'PressesSuccessful',
+            '%': 'PressesSuccessfulPercentage',
+            'Def 3rd1': 'PressesDefThird',
+            'Mid 3rd1': 'PressesMidThird',
+            'Att 3rd1': 'PressesAttThird',
+            'Blocks': 'BlockedBall',
+            'Sh': 'BlockedShots',
+            'ShSv': 'BlockedSoT',
+            'Pass': 'BlockedPasses',
+            'Int': 'Interceptions',
+            'Tkl+Int': 'Tackles+Interceptions',
+            'Clr': 'Clearances',
+            'Err': 'ErrortoShot',
+        },
+    ),
+    TableSpec(
+        name='shootingstats', page='shooting', table_id='stats_shooting', sql_table='shootingstats',
+        drop=PLAYER_DROP + ('PK', 'PKatt', 'npxG', 'xG', 'Gls'),
+        rename={
+            'Sh': 'ShotsTotal',
+            'Sh/90': 'Shots90',
+            'SoT/90': 'SoT90',
+            'G/Sh': 'GoalsPerShot',
+            'Dist': 'ShotDistanceAverage',
+            'npxG/Sh': 'npxGPerShot',
+            'FK': 'FKShot',
+            'np:G-xG': 'npG-npxG',
+        },
+    ),
+    TableSpec(
+        name='creativestats', page='gca', table_id='stats_gca', sql_table='creativestats',
+        drop=PLAYER_DROP,
+        rename={
+            'SCA': 'ChancesCreated',
+            'SCA90': 'ChancesCreated90',
+            'PassLive': 'LivePasstoShot',
+            'PassDead': 'DeadPasstoShot',
+            'Drib': 'DribbletoShot',
+            'Sh': 'ShottoShot',
+            'Fld': 'FoulstoShot',
+            'Def': 'DefensiveActiontoShot',
+            'GCA': 'BigChancesCreated',
+            'GCA90': 'BigChancesCreated90',
+            'PassLive1': 'LivePasstoGoal',
+            'PassDead1': 'DeadPasstoGoal',
+            'Drib1': 'DribbletoGoal',
+            'Sh1': 'ShottoGoalShot',
+            'Fld1': 'FoultoGoal',
+            'Def1': 'DefensiveActiontoGoal',
+        },
+    ),
+    # Only persisted as part of player_season_facts
+    TableSpec(
+        name='passingstats', page='passing', table_id='stats_passing',
+        drop=PLAYER_DROP + ('Ast', 'xA'),
+        rename={
+            'Cmp': 'PassesCompletedTotal',
+            'Att': 'PassesAttempted',
+            'Cmp%': 'PassCompletedPercentage',
+            'TotDist': 'PassDistanceTotal',
+            'PrgDist': 'PassDistanceProgressive',
+            'Cmp1': 'PassCompletedShort',
+            'Att1': 'PassAttemptedShort',
+            'Cmp%1': 'PassCompletedShortPercentage',
+            'Cmp2': 'PassCompletedMedium',
+            'Att2': 'PassAttemptedMedium',
+            'Cmp%2': 'PassCompletedMediumPercentage',
+            'Cmp3': 'PassCompletedLong',
+            'Att3': 'PassAttemptedLong',
+            'Cmp%3': 'PassCompletedLongPercentage',
+            'KP': 'KeyPasses',
+            '1/3': 'PassIntoAttThird',
+            'PPA': 'PassCompleted18Yard',
+            'CrsPA': 'CrossesCompleted18Yard',
+            'Prog': 'PassProgressive',
+        },
+    ),
+    TableSpec(
+        name='passtypestats', page='passing_types', table_id='stats_passing_types', sql_table='passtypestats',
+        drop=PLAYER_DROP + ('Att', 'Cmp'),
+        rename={
+            'Live': 'PassLiveBall',
+            'Dead': 'PassDeadBall',
+            'FK': 'PassFreeKick',
+            'TB': 'PassDefensive',
+            'Press': 'PassUnderPress',
+            'Sw': 'PassWide',
+            'Crs': 'Crosses',
+            'CK': 'Corners',
+            'In': 'CornersIn',
+            'Out': 'CornersOut',
+            'Str': 'CornersStraight',
+            'Ground': 'PassGround',
+            'Low': 'PassLow',
+            'High': 'PassHigh',
+            'Left': 'PassAttemptLeftFoot',
+            'Right': 'PassAttemptRightFoot',
+            'Head': 'PassAttemptHead',
+            'TI': 'ThrowInsTaken',
+            'Off': 'PasstoOffside',
+            'Out1': 'PasstoOutbound',
+            'Int': 'PassIntercepted',
+            'Blocks': 'PassBlocked',
+        },
+    ),
+    TableSpec(
+        name='possessionstats', page='possession', table_id='stats_possession', sql_table='possessionstats',
+        drop=PLAYER_DROP,
+        rename={
+            'Def Pen': 'TouchesDefPen',
+            'Def 3rd': 'TouchesDefThird',
+            'Mid 3rd': 'TouchesMidThird',
+            'Att 3rd': 'TouchesAttThird',
+            'Att Pen': 'TouchesAttPen',
+            'Succ': 'DribbleSuccess',
+            'Att': 'DribbleAttempt',
+            'Succ%': 'DribbleSuccessPercentage',
+            '#PI': 'DribbledPlayers',
+            'Megs': 'Nutmegs',
+            'TotDist': 'CarriesTotalDistance',
+            'PrgDist': 'CarriesProgressiveDistance',
+            'Prog': 'CarriesProgressive',
+            '1/3': 'CarriesAtt3rd',
+            'CPA': 'Carries18Yard',
+            'Mis': 'FailedBallAttempt',
+            'Dis': 'LostBallTackle',
+            'Targ': 'PassReceiveAttempt',
+            'Rec': 'PassReceiveSuccess',
+            'Rec%': 'PassReceiveSuccessPercentage',
+            'Prog1': 'PassReceiveProgressive',
+        },
+    ),
+    TableSpec(
+        name='keeperbasic', page='keepers', table_id='stats_keeper', sql_table='keeperbasic',
+        drop=PLAYER_DROP + ('MP', 'Starts', 'Min', 'W', 'D', 'L'),
+        rename={
+            'GA': 'GC',
+            'GA90': 'GC90',
+            'Save%': 'SoTSavePercentage',
+            'Save%1': 'PenaltiesSavePercentage',
+            'PKatt': 'PenaltiesAgainst',
+            'PKA': 'PenaltiesAllowed',
+            'PKsv': 'PenaltiesSaved',
+            'PKm': 'PenaltiesMissed',
+        },
+    ),
+    TableSpec(
+        name='keeperadvanced', page='keepersadv', table_id='stats_keeper_adv', sql_table='keeperadvanced',
+        drop=PLAYER_DROP + ('GA', 'PKA'),
+        rename={
+            'FK': 'GCFreeKick',
+            'CK': 'GCCorner',
+            'OG': 'GCOwnGoal',
+            'PSxG': 'PostShotxG',
+            'PSxG/SoT': 'PostShotxGPerSoT',
+            'PSxG+/-': 'PostShotxG-GC',
+            '/90': 'PostShotxG-GC90',
+            'Cmp': 'PassCompleted40Y',
+            'Att': 'PassAttempted40Y',
+            'Cmp%': 'PassCompleted40YPercentage',
+            'Att1': 'PassAttemptedGoalKick',
+            'Thr': 'ThrowsAttempted',
+            'Launch%': 'PassCompleted40Y%-GoalKick',
+            'AvgLen': 'PassAvgLength',
+            'Att2': 'GoalKickAttempted',
+            'Launch%1': 'GoalKick40YPercentage',
+            'AvgLen1': 'GoalKickAvgLength',
+            'Opp': 'CrossesAttemptOpponentPenArea',
+            'Stp': 'CrossesAttemptOpponentPenAreaStopped',
+            'Stp%': 'CrossesAttemptOpponentPenAreaStoppedPercentage',
+            '#OPA': 'DefensiveActionOutPenArea',
+            '#OPA/90': 'DefensiveActionOutPenArea90',
+            'AvgDist': 'AvgDistanceFromGoalDefensiveAction',
+        },
+    ),
+]
+
+FACTS_TABLE = 'player_season_facts'
+
+# Page slugs in the order they appear in the registry
+PAGES = list(dict.fromkeys(spec.page for spec in TABLE_SPECS))
+
+
+def specs_for(page):
+    return [spec for spec in TABLE_SPECS if spec.page == page]
+
+
+def is_text(dtype):
+    """True for object columns and, as pandas 3 reads text, the string dtype."""
+    return pd.api.types.is_string_dtype(dtype) or pd.api.types.is_object_dtype(dtype)
+
+
+def coerce_stat(name, values):
+    """Numeric dtype for one stat column: float32 for rates, otherwise a nullable Int32.
+
+    Counts are always Int32 whatever this week's values are: totals like pass distance grow past
+    the 16-bit range mid-season, and the table's column type is fixed when it's first created.
+    FBRef writes thousands with commas and leaves a cell blank when there's nothing to report.
+    """
+    if is_text(values.dtype):
+        values = values.astype(str).str.replace(',', '', regex=False)
+    values = pd.to_numeric(values, errors='coerce')
+    if FLOAT_STAT.search(name) or values.mod(1).fillna(0).ne(0).any():
+        return values.astype('float32')
+    return values.astype('Int32')
+
+
+def coerce(df):
+    return pd.DataFrame({column: df[column] if column in TEXT_COLUMNS else coerce_stat(column, df[column])
+                         for column in df.columns}, index=df.index)
+
+
+def transform(spec, raw):
+    """Apply ``spec`` to a table straight out of ``pd.read_html``.
+
+    Row and column selection is worked out on the labels first so the data is copied once, then
+    every stat is given a numeric dtype (see ``coerce``).
+    """
+    names = raw.columns.droplevel(0) if raw.columns.nlevels > 1 else raw.columns
+    keep = ~names.isin(spec.drop)
+
+    if spec.players:
+        # Mid-table header rows repeat 'Rk', transfers within the league repeat the player
+        rows = (raw.iloc[:, names.get_loc('Rk')].ne('Rk') & ~raw.iloc[:, names.get_loc('Player')].duplicated()).to_numpy()
+    else:
+        rows = np.ones(len(raw), dtype=bool)
+
+    df = raw.iloc[rows, keep]
+    if spec.columns is not None:
+        df.columns = list(spec.columns)
+    else:
+        # Split duplicate columns due to "Per 90s" stats
+        kept = pd.Series(names[keep])
+        labels = kept + kept.groupby(kept).cumcount().replace(0, '').astype(str)
+        df.columns = [spec.rename.get(label, label) for label in labels]
+    df.index = pd.RangeIndex(len(df))
+    return coerce(df)
+
+
+def player_key(players):
+    """Stable 64-bit integer for each player name, the join key of ``player_season_facts``."""
+    return pd.Series(pd.util.hash_pandas_object(players, index=False).to_numpy().view('int64'),
+                     index=players.index, name='player_key')
+
+
+def player_season_facts(frames):
+    """Join every player table onto ``playerstandard`` as one wide row per player.
+
+    Tables are indexed on ``player_key`` and joined on it in one pass. Player tables already have
+    transfer duplicates removed, so the key is unique. A column name that's already taken gets the
+    table name as a suffix, e.g. ``Touches_possessionstats``.
+    """
+    base = frames['playerstandard']
+    facts = [base.set_index(player_key(base['Player']))]
+    taken = set(base.columns)
+    for spec in TABLE_SPECS:
+        if not spec.players or spec.name == 'playerstandard':
+            continue
+        df = frames[spec.name]
+        df = df.set_index(player_key(df['Player'])).drop(columns=['Player', 'Squad'])
+        df.columns = [f'{column}_{spec.name}' if column in taken else column for column in df.columns]
+        taken.update(df.columns)
+        facts.append(df)
+    return facts[0].join(facts[1:], how='left').rename_axis('player_key').reset_index()
+
+
+def extract_table(html, table_id):
+    """Return the markup of the table with ``table_id`` from the raw page bytes.
+
+    FBRef ships most tables inside HTML comments; slicing out just the ``<table>`` element
+    leaves the comment markers behind, so nothing else on the page gets un-commented or parsed.
+    """
+    match = re.search(rb'<table\b[^>]*\sid="%s"' % re.escape(table_id.encode()), html)
+    if match is None:
+        raise ValueError(f"Table {table_id!r} not found on page")
+    end = html.find(b'</table>', match.end())
+    return html[match.start():end + len(b'</table>')].decode('utf-8')
+
+
+def read_table(html, table_id):
+    return pd.read_html(StringIO(extract_table(html, table_id)))[0]
+
+
+def transform_page(html, specs):
+    """Parse the given specs' tables out of one FBRef page and return ``{spec.name: frame}``."""
+    return _timed_transform_page(html, specs)[0]
+
+
+def _timed_transform_page(html, specs):
+    # Also returns (stage, table, seconds, rows in, rows out) for read_html and the transform of each table
+    frames, timings = {}, []
+    for spec in specs:
+        started = time.perf_counter()
+        raw = read_table(html, spec.table_id)
+        parsed = time.perf_counter()
+        frames[spec.name] = transform(spec, raw)
+        timings.append(('read_html', spec.name, parsed - started, None, len(raw)))
+        timings.append(('transform', spec.name, time.perf_counter() - parsed, len(raw), len(frames[spec.name])))
+    return frames, timings
+
+
+def parse_pages(html_by_page, workers=None, report=None, failures=None):
+    """Parse and transform FBRef pages across a process pool, one page per task.
+
+    ``html_by_page`` maps page slug to the raw page bytes. Workers send back only the
+    transformed frames, not every table on the page. ``workers``
+    defaults to the number of CPUs; ``workers=1`` parses in this process. With a ``report``
+    the read_html and transform time and rows of every table are recorded. A page that fails
+    to parse raises, unless a ``failures`` dict is passed: its tables are then left out and the
+    exception stored under the page slug.
+    """
+    def result(page, parse):
+        try:
+            return parse()
+        except Exception as error:
+            if failures is None:
+                raise
+            logger.error("Parsing FBRef page %s failed, skipping its tables: %r", page, error)
+            failures[page] = error
+            return {}, []
+
+    if workers == 1:
+        results = [result(page, partial(_timed_transform_page, html, specs_for(page)))
+                   for page, html in html_by_page.items()]
+    else:
+        # Forked workers start instantly with everything already imported
+        context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {page: pool.submit(_timed_transform_page, html, specs_for(page))
+                       for page, html in html_by_page.items()}
+            results = [result(page, future.result) for page, future in futures.items()]
+
+    frames = {}
+    for page_frames, timings in results:
+        frames.update(page_frames)
+        if report is not None:
+            for stage, table, seconds, rows_in, rows_out in timings:
+                report.record(stage, source='fbref', table=table, seconds=seconds, rows_in=rows_in, rows_out=rows_out)
+    return frames
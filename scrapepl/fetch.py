@@ -0,0 +1,339 @@
+import asyncio
+import datetime
+import email.utils
+import json
+import logging
+import random
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+FPL_URL = 'https://fantasy.premierleague.com/api/bootstrap-static/'
+FBREF_URL = 'https://fbref.com/en/comps/{comp}/{page}/{slug}-Stats'
+FBREF_SEASON_URL = 'https://fbref.com/en/comps/{comp}/{years}/{page}/{years}-{slug}-Stats'
+
+# Understat league name -> FBRef competition id and URL slug
+LEAGUES = {
+    'EPL': (9, 'Premier-League'),
+    'La_liga': (12, 'La-Liga'),
+    'Bundesliga': (20, 'Bundesliga'),
+    'Serie_A': (11, 'Serie-A'),
+    'Ligue_1': (13, 'Ligue-1'),
+}
+
+# Connection pool sizing. FBRef rate limits aggressively so it gets its own, lower cap.
+MAX_CONNECTIONS = 20
+DEFAULT_HOST_LIMIT = 4
+HOST_LIMITS = {'fbref.com': 2}
+
+# Statuses worth another try; anything else is raised straight away
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Longest Retry-After we wait for, in seconds
+MAX_RETRY_AFTER = 300
+
+# Seconds to connect and between reads of the body; a whole request gives up after TOTAL_TIMEOUT
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 30
+TOTAL_TIMEOUT = 120
+
+# Failures in a row that open a host's circuit, and seconds it stays open
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 60
+
+
+class CircuitOpenError(ConnectionError):
+    pass
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait in a ``Retry-After`` header, None without one."""
+    value = (getattr(error, 'headers', None) or {}).get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+class RateLimiter:
+    """Spaces calls to ``wait`` at least ``1 / rate`` seconds apart."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    """Fails requests to one host fast once ``threshold`` of them in a row have failed.
+
+    The circuit stays open for ``cooldown`` seconds, then a single trial request is let through:
+    if it succeeds the circuit closes, if it fails it opens again.
+    """
+
+    def __init__(self, host, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.host = host
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def check(self):
+        if self.opened_at is None:
+            return
+        remaining = self.opened_at + self.cooldown - time.monotonic()
+        if remaining > 0 or self._trial:
+            raise CircuitOpenError(f"{self.host} failed {self.failures} times in a row, not retrying for "
+                                   f"{max(remaining, 0):.0f}s")
+        self._trial = True
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def failure(self):
+        self.failures += 1
+        trial, self._trial = self._trial, False
+        if self.failures < self.threshold:
+            return
+        if self.opened_at is None or trial:
+            logger.warning("%s failed %d times in a row, pausing requests to it for %ds", self.host, self.failures,
+                           self.cooldown)
+        self.opened_at = time.monotonic()
+
+
+class Fetcher:
+    """Shared HTTP client that caps the number of in-flight requests per host.
+
+    With a ``cache`` (an ``httpcache.ResponseCache``) requests are made conditional on the cached
+    ETag/Last-Modified and a 304 is answered from disk. ``offline`` serves everything from the
+    cache and raises ``LookupError`` for anything it doesn't hold. ``rate_limits`` caps requests per
+    second per host. Every request has connect and read timeouts, and failed requests are retried
+    ``retries`` times with jittered exponential backoff, or after the server's ``Retry-After``.
+    A host that keeps failing gets its circuit opened (see ``CircuitBreaker``) and its requests
+    raise ``CircuitOpenError`` straight away.
+    """
+
+    def __init__(self, session, host_limits=None, default_limit=DEFAULT_HOST_LIMIT, cache=None, offline=False,
+                 rate_limits=None, retries=3, backoff=1.0, timeout=None):
+        if offline and cache is None:
+            raise ValueError("Offline mode needs a response cache")
+        self.session = session
+        self.host_limits = {**HOST_LIMITS, **(host_limits or {})}
+        self.default_limit = default_limit
+        self.cache = cache
+        self.offline = offline
+        self.rate_limiters = {host: RateLimiter(rate) for host, rate in (rate_limits or {}).items()}
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout or aiohttp.ClientTimeout(total=TOTAL_TIMEOUT, sock_connect=CONNECT_TIMEOUT,
+                                                        sock_read=READ_TIMEOUT)
+        self.breakers = {}
+        self.requests = 0
+        # Bytes fetched over the network per URL; cache hits and 304s add nothing
+        self.downloaded = {}
+        self._semaphores = {}
+
+    def _semaphore(self, url):
+        host = urlsplit(url).hostname
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.host_limits.get(host, self.default_limit))
+        return self._semaphores[host]
+
+    def _breaker(self, url):
+        host = urlsplit(url).hostname
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(host)
+        return self.breakers[host]
+
+    async def read(self, url, headers=None):
+        cached = self.cache.get(url) if self.cache is not None else None
+        if self.offline:
+            if cached is None:
+                raise LookupError(f"{url} is not in the HTTP cache")
+            return cached.body
+
+        headers = dict(headers or {})
+        if cached is not None:
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+
+        breaker = self._breaker(url)
+        for attempt in range(self.retries + 1):
+            breaker.check()
+            try:
+                body = await self._request(url, headers, cached)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                retryable = not isinstance(error, aiohttp.ClientResponseError) or error.status in RETRY_STATUSES
+                if not retryable:
+                    # The host answered, it's this URL that's bad
+                    breaker.success()
+                    raise
+                breaker.failure()
+                if attempt == self.retries:
+                    raise
+                # Jitter so requests that failed together don't all come back at once
+                delay = random.uniform(0.5, 1.0) * self.backoff * 2 ** attempt
+                asked = retry_after(error)
+                if asked is not None:
+                    delay = max(delay, min(asked, MAX_RETRY_AFTER))
+                logger.warning("%s failed (%s), retrying in %.1fs", url, str(error) or type(error).__name__, delay)
+                await asyncio.sleep(delay)
+            else:
+                breaker.success()
+                return body
+
+    async def _request(self, url, headers, cached):
+        async with self._semaphore(url):
+            limiter = self.rate_limiters.get(urlsplit(url).hostname)
+            if limiter is not None:
+                await limiter.wait()
+            self.requests += 1
+            async with self.session.get(url, headers=headers, timeout=self.timeout) as response:
+                if response.status == 304 and cached is not None:
+                    self.cache.touch(url)
+                    return cached.body
+                response.raise_for_status()
+                body = await response.read()
+
+        self.downloaded[url] = self.downloaded.get(url, 0) + len(body)
+        if self.cache is not None:
+            self.cache.put(url, body, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return body
+
+    async def text(self, url, headers=None):
+        return (await self.read(url, headers)).decode('utf-8')
+
+    async def json(self, url, headers=None):
+        return json.loads(await self.read(url, headers))
+
+    def understat(self):
+        """An understat client whose requests go through this Fetcher."""
+        from understat import Understat
+        return Understat(_SessionAdapter(self))
+
+    async def understat_players(self, league='EPL', season=2021):
+        return await self.understat().get_league_players(league, season)
+
+
+class _SessionAdapter:
+    """Just enough of ``aiohttp.ClientSession`` for the understat client to go through a Fetcher."""
+
+    def __init__(self, fetcher):
+        self.fetcher = fetcher
+
+    def get(self, url, headers=None, **kwargs):
+        return _Response(self.fetcher, url, headers)
+
+
+class _Response:
+    def __init__(self, fetcher, url, headers):
+        self.fetcher = fetcher
+        self.url = url
+        self.headers = headers
+        self.status = 200
+        self._body = None
+
+    async def __aenter__(self):
+        self._body = await self.fetcher.read(self.url, self.headers)
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    async def read(self):
+        return self._body
+
+    async def text(self):
+        return self._body.decode('utf-8')
+
+    async def json(self):
+        return json.loads(self._body)
+
+
+def fbref_url(page, league='EPL', season=None):
+    """URL of an FBRef stats page. ``season`` is the starting year, None for the current season."""
+    comp, slug = LEAGUES[league]
+    if season is None:
+        return FBREF_URL.format(comp=comp, page=page, slug=slug)
+    return FBREF_SEASON_URL.format(comp=comp, years=f'{season}-{season + 1}', page=page, slug=slug)
+
+
+def connector(limit=MAX_CONNECTIONS):
+    # Keep-alive pooling: connections are reused across pages on the same host
+    return aiohttp.TCPConnector(limit=limit, keepalive_timeout=60)
+
+
+async def fetch_all(pages, season=2021, host_limits=None, cache=None, offline=False, report=None, fpl=True,
+                    understat=True, failures=None):
+    """Download FPL bootstrap-static, Understat league players and the FBRef pages concurrently.
+
+    Returns ``(fpl_payload, understat_players, fbref_html)`` where ``fbref_html`` maps page slug to the
+    undecoded page bytes. ``fpl=False`` or ``understat=False`` skips that source and returns None in
+    its place. With a ``report`` (an ``instrumentation.RunReport``) each source's wall time and
+    bytes downloaded are recorded.
+
+    The first source to fail raises, unless a ``failures`` dict is passed: then every source is
+    fetched regardless, and each failed one is left out (None, or missing from ``fbref_html``) and
+    its exception stored under ``fpl``, ``understat`` or ``fbref/<page>``.
+    """
+    timings = {}
+
+    async def timed(source, coro):
+        started = time.perf_counter()
+        result = await coro
+        timings[source] = time.perf_counter() - started
+        return result
+
+    async def skipped():
+        return None
+
+    sources = ['fpl', 'understat'] + [f'fbref/{page}' for page in pages]
+    async with aiohttp.ClientSession(connector=connector()) as session:
+        fetcher = Fetcher(session, host_limits=host_limits, cache=cache, offline=offline)
+        results = await asyncio.gather(
+            timed('fpl', fetcher.json(FPL_URL)) if fpl else skipped(),
+            timed('understat', fetcher.understat_players('EPL', season)) if understat else skipped(),
+            *(timed(f'fbref/{page}', fetcher.read(fbref_url(page))) for page in pages),
+            return_exceptions=failures is not None,
+        )
+    for source, result in zip(sources, results):
+        if isinstance(result, Exception):
+            logger.error("Fetching %s failed, skipping it: %r", source, result)
+            failures[source] = result
+    results = [None if isinstance(result, Exception) else result for result in results]
+    if report is not None:
+        urls = {'fpl': [FPL_URL], **{f'fbref/{page}': [fbref_url(page)] for page in pages}}
+        urls['understat'] = [url for url in fetcher.downloaded if urlsplit(url).hostname == 'understat.com']
+        for source, seconds in timings.items():
+            report.record('download', source=source, seconds=seconds,
+                          bytes=sum(fetcher.downloaded.get(url, 0) for url in urls[source]))
+    fbref_html = {page: html for page, html in zip(pages, results[2:]) if html is not None}
+    fetched = [name for name, result in (('FPL', results[0]), ('Understat', results[1])) if result is not None]
+    logger.info("Fetched %s%d FBRef pages%s", ''.join(f'{name}, ' for name in fetched), len(fbref_html),
+                " from cache" if offline else "")
+    return results[0], results[1], fbref_html
@@ -0,0 +1,58 @@
+import pandas as pd
+
+# bootstrap-static element fields loaded by default
+FPL_COLUMNS = ["id", "element_type", "first_name", "second_name", "photo", "team", "web_name", "points_per_game",
+               "now_cost", "clean_sheets"]
+
+# dtypes for element fields. Numbers often arrive as strings ("5.2"), so they go through to_numeric.
+# Fields not listed here are loaded as they come.
+FIELD_DTYPES = {
+    'id': 'int16', 'code': 'int32', 'element_type': 'int8', 'team': 'int8', 'team_code': 'int16',
+    'now_cost': 'float32', 'cost_change_event': 'int8', 'cost_change_event_fall': 'int8',
+    'cost_change_start': 'int8', 'cost_change_start_fall': 'int8',
+    'chance_of_playing_next_round': 'Int8', 'chance_of_playing_this_round': 'Int8', 'squad_number': 'Int8',
+    'dreamteam_count': 'int8', 'event_points': 'int16', 'total_points': 'int16', 'bonus': 'int16', 'bps': 'int16',
+    'minutes': 'int16', 'goals_scored': 'int16', 'assists': 'int16', 'clean_sheets': 'int16',
+    'goals_conceded': 'int16', 'own_goals': 'int16', 'penalties_saved': 'int16', 'penalties_missed': 'int16',
+    'yellow_cards': 'int16', 'red_cards': 'int16', 'saves': 'int16', 'starts': 'int16',
+    'transfers_in': 'int32', 'transfers_in_event': 'int32', 'transfers_out': 'int32', 'transfers_out_event': 'int32',
+    'points_per_game': 'float32', 'form': 'float32', 'selected_by_percent': 'float32', 'ep_next': 'float32',
+    'ep_this': 'float32', 'value_form': 'float32', 'value_season': 'float32', 'influence': 'float32',
+    'creativity': 'float32', 'threat': 'float32', 'ict_index': 'float32', 'expected_goals': 'float32',
+    'expected_assists': 'float32', 'expected_goal_involvements': 'float32', 'expected_goals_conceded': 'float32',
+    'status': 'category',
+}
+
+
+def coerce(df):
+    """Cast every column listed in ``FIELD_DTYPES`` in place."""
+    for column, dtype in FIELD_DTYPES.items():
+        if column not in df:
+            continue
+        if dtype == 'category':
+            df[column] = df[column].astype('category')
+        else:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+    return df
+
+
+def players_frame(payload, columns=None):
+    """Build ``players_fpl`` from a bootstrap-static payload with a columnar, typed transform.
+
+    ``columns`` lists extra element fields to keep on top of ``FPL_COLUMNS``, or ``'all'`` for every field.
+    ``position`` and ``team_name`` are categoricals and ``now_cost`` is in pounds.
+    """
+    if columns == 'all':
+        fields = list(dict.fromkeys(FPL_COLUMNS + list(payload['elements'][0]))) if payload['elements'] else FPL_COLUMNS
+    else:
+        fields = list(dict.fromkeys(FPL_COLUMNS + list(columns or [])))
+    df = coerce(pd.DataFrame.from_records(payload['elements'], columns=fields))
+
+    df['player'] = df['first_name'].str.cat(df['second_name'], sep=' ')
+    positions = pd.Series({row['id']: row['plural_name_short'] for row in payload['element_types']})
+    teams = pd.Series({row['id']: row['name'] for row in payload['teams']})
+    df['position'] = pd.Categorical(df['element_type'].map(positions), categories=positions.unique())
+    df['team_name'] = pd.Categorical(df['team'].map(teams), categories=teams.sort_values().unique())
+    # Prices come in tenths of a million
+    df['now_cost'] = (df['now_cost'] / 10).astype('float32')
+    return df
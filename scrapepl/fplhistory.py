@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+
+import aiohttp
+import pandas as pd
+
+from . import fetch, fpl, loader
+from .checkpoint import Checkpoint
+
+logger = logging.getLogger(__name__)
+
+ELEMENT_SUMMARY_URL = 'https://fantasy.premierleague.com/api/element-summary/{id}/'
+HISTORY_TABLE = 'players_fpl_history'
+HISTORY_KEYS = ['season', 'element', 'fixture']
+# One partition per season hash bucket, so a season's rows can be scanned or dropped on their own
+HISTORY_PARTITION = 'PARTITION BY KEY (season) PARTITIONS 8'
+
+# element-summary history fields kept. Pinned so a new field in the API doesn't reshape the table.
+HISTORY_COLUMNS = ['element', 'fixture', 'round', 'kickoff_time', 'opponent_team', 'was_home', 'team_h_score',
+                   'team_a_score', 'minutes', 'total_points', 'goals_scored', 'assists', 'clean_sheets',
+                   'goals_conceded', 'own_goals', 'penalties_saved', 'penalties_missed', 'yellow_cards', 'red_cards',
+                   'saves', 'bonus', 'bps', 'influence', 'creativity', 'threat', 'ict_index', 'value',
+                   'transfers_balance', 'selected', 'transfers_in', 'transfers_out']
+HISTORY_DTYPES = {'season': 'int16', 'element': 'int16', 'fixture': 'int16', 'round': 'int8', 'opponent_team': 'int8',
+                  'team_h_score': 'Int8', 'team_a_score': 'Int8', 'value': 'int16', 'transfers_balance': 'int32',
+                  'selected': 'int32'}
+
+CONCURRENCY = 8
+# Requests per second against fantasy.premierleague.com
+RATE = 10.0
+# Players fetched between database writes (and checkpoint updates)
+BATCH_PLAYERS = 50
+CHECKPOINT = '.state/fpl_history.json'
+
+
+def season_of(payload):
+    """Starting year of the season a bootstrap-static payload belongs to."""
+    return int(payload['events'][0]['deadline_time'][:4])
+
+
+def current_event(payload):
+    return next((event['id'] for event in payload['events'] if event['is_current']), 0)
+
+
+def history_frame(season, histories):
+    """One typed row per player per fixture from a list of element-summary ``history`` lists."""
+    df = pd.DataFrame.from_records([row for history in histories for row in history], columns=HISTORY_COLUMNS)
+    df.insert(0, 'season', season)
+    df = fpl.coerce(df)
+    for column, dtype in HISTORY_DTYPES.items():
+        df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+    df['was_home'] = df['was_home'].astype(bool)
+    # MySQL DATETIME has no zone, store UTC
+    df['kickoff_time'] = pd.to_datetime(df['kickoff_time'], utc=True).dt.tz_localize(None)
+    return df
+
+
+async def load_history(engine, player_ids, season, event, cache=None, offline=False, concurrency=CONCURRENCY,
+                       rate=RATE, checkpoint_path=CHECKPOINT, failures=None):
+    """Fetch element-summary for every player and append the gameweek rows to ``players_fpl_history``.
+
+    ``concurrency`` workers share one Fetcher limited to ``rate`` requests per second. Rows are written
+    every ``BATCH_PLAYERS`` players; the checkpoint records which players are done so a rerun for
+    the same gameweek skips them. Returns a summary of the run.
+
+    The first player whose request fails raises, unless a ``failures`` dict is passed: the player is
+    then skipped, its exception stored under the player id, and left out of the checkpoint so a rerun
+    fetches it again.
+    """
+    checkpoint = Checkpoint(checkpoint_path, f'{season}-{event}')
+    player_ids = [int(player_id) for player_id in player_ids]
+    todo = [player_id for player_id in player_ids if player_id not in checkpoint.done]
+    if len(todo) < len(player_ids):
+        logger.info("Resuming FPL history, %d of %d players already loaded", len(player_ids) - len(todo),
+                    len(player_ids))
+
+    queue = asyncio.Queue()
+    for player_id in todo:
+        queue.put_nowait(player_id)
+    results = asyncio.Queue()
+    writer = loader.default_writer(engine)
+    started = time.perf_counter()
+    rows = 0
+
+    host = 'fantasy.premierleague.com'
+    async with aiohttp.ClientSession(connector=fetch.connector(concurrency)) as session:
+        fetcher = fetch.Fetcher(session, host_limits={host: concurrency}, cache=cache, offline=offline,
+                                rate_limits={host: rate})
+
+        async def worker():
+            while not queue.empty():
+                player_id = queue.get_nowait()
+                try:
+                    summary = await fetcher.json(ELEMENT_SUMMARY_URL.format(id=player_id))
+                except Exception as error:
+                    if failures is None:
+                        # Hand the failure to the writer loop, which would otherwise wait for this player forever
+                        await results.put(error)
+                        return
+                    logger.error("Fetching FPL history of player %d failed, skipping them: %r", player_id, error)
+                    failures[player_id] = error
+                    await results.put((player_id, None))
+                    continue
+                await results.put((player_id, summary['history']))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(todo)))]
+        try:
+            pending = len(todo)
+            while pending:
+                batch = []
+                while len(batch) < BATCH_PLAYERS and pending:
+                    result = await results.get()
+                    if isinstance(result, Exception):
+                        raise result
+                    pending -= 1
+                    if result[1] is not None:
+                        batch.append(result)
+                if not batch:
+                    continue
+                frame = history_frame(season, [history for _, history in batch])
+                # The write blocks, keep fetching meanwhile
+                await asyncio.to_thread(loader.append, engine, frame, HISTORY_TABLE, HISTORY_KEYS, writer,
+                                        HISTORY_PARTITION)
+                checkpoint.add(player_id for player_id, _ in batch)
+                rows += len(frame)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+
+    if not failures:
+        checkpoint.clear()
+    seconds = time.perf_counter() - started
+    summary = {'players': len(todo), 'rows': rows, 'requests': fetcher.requests, 'concurrency': concurrency,
+               'seconds': seconds, 'requests_per_sec': fetcher.requests / seconds if seconds else 0.0,
+               'bytes': sum(fetcher.downloaded.values())}
+    logger.info("FPL history: %d players, %d rows, %d requests in %.1fs (%.1f req/s at concurrency %d)",
+                summary['players'], rows, summary['requests'], seconds, summary['requests_per_sec'], concurrency)
+    return summary
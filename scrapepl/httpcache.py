@@ -0,0 +1,120 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    body: bytes
+    etag: str = None
+    last_modified: str = None
+
+
+class ResponseCache:
+    """Content-addressed on-disk cache of HTTP response bodies.
+
+    Bodies live under ``objects/`` named by the SHA-256 of their content, so identical payloads
+    are stored once. ``index/`` holds one JSON record per URL with the body hash, the validators
+    for conditional requests and store/access times used for TTL and LRU eviction.
+    """
+
+    def __init__(self, directory='.cache/http', ttl=30 * 24 * 3600, max_bytes=500 * 1024 ** 2):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(directory, 'index'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+
+    def _index_path(self, url):
+        return os.path.join(self.directory, 'index', hashlib.sha256(url.encode()).hexdigest() + '.json')
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, 'objects', digest)
+
+    def _read_record(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_record(self, path, record):
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(record, f)
+        os.replace(tmp, path)
+
+    def get(self, url):
+        record = self._read_record(self._index_path(url))
+        if record is None:
+            return None
+        try:
+            with open(self._object_path(record['sha256']), 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+        return CachedResponse(url, body, record.get('etag'), record.get('last_modified'))
+
+    def put(self, url, body, etag=None, last_modified=None):
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(body)
+            os.replace(tmp, path)
+        now = time.time()
+        self._write_record(self._index_path(url), {
+            'url': url,
+            'sha256': digest,
+            'size': len(body),
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored': now,
+            'accessed': now,
+        })
+
+    def touch(self, url):
+        """Mark ``url`` as revalidated (a 304) and recently used."""
+        path = self._index_path(url)
+        record = self._read_record(path)
+        if record is not None:
+            record['stored'] = record['accessed'] = time.time()
+            self._write_record(path, record)
+
+    def prune(self):
+        """Drop entries older than the TTL, then least recently used ones until under ``max_bytes``."""
+        index_dir = os.path.join(self.directory, 'index')
+        now = time.time()
+        records = []
+        for name in os.listdir(index_dir):
+            path = os.path.join(index_dir, name)
+            record = self._read_record(path)
+            if record is None or now - record['stored'] > self.ttl:
+                os.remove(path)
+            else:
+                records.append((path, record))
+
+        records.sort(key=lambda item: item[1]['accessed'], reverse=True)
+        live, total = set(), 0
+        for path, record in records:
+            if record['sha256'] not in live:
+                if total + record['size'] > self.max_bytes:
+                    os.remove(path)
+                    continue
+                total += record['size']
+            live.add(record['sha256'])
+
+        objects_dir = os.path.join(self.directory, 'objects')
+        removed = 0
+        for digest in os.listdir(objects_dir):
+            if digest not in live:
+                os.remove(os.path.join(objects_dir, digest))
+                removed += 1
+        logger.info("HTTP cache holds %d objects, %.1f MB (%d evicted)", len(live), total / 1024 ** 2, removed)
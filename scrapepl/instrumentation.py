@@ -0,0 +1,161 @@
+import datetime
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; memory is then reported as None
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = 'scrapepl'
+
+
+def peak_rss():
+    """High-water mark of this process's resident memory in bytes, None where unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@dataclass
+class StageRecord:
+    stage: str
+    source: str = None
+    table: str = None
+    seconds: float = None
+    bytes: int = None
+    peak_rss_delta: int = None
+    rows_in: int = None
+    rows_out: int = None
+
+    @property
+    def rows_per_sec(self):
+        if self.rows_out is None or not self.seconds:
+            return None
+        return self.rows_out / self.seconds
+
+
+@dataclass
+class Failure:
+    stage: str
+    source: str = None
+    table: str = None
+    error: str = None
+
+
+class RunReport:
+    """Per-stage measurements of one run: wall time, bytes, peak RSS growth and rows in/out.
+
+    ``stage`` times a block and measures how far the peak RSS rose during it; ``record`` adds
+    measurements taken elsewhere, such as per-table load results. ``fail`` lists a source or table
+    that was skipped because it failed.
+    """
+
+    def __init__(self):
+        self.started = datetime.datetime.now(datetime.timezone.utc)
+        self._clock = time.perf_counter()
+        self.records = []
+        self.failures = []
+
+    @contextmanager
+    def stage(self, stage, source=None, table=None, rows_in=None):
+        record = StageRecord(stage, source, table, rows_in=rows_in)
+        rss = peak_rss()
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - started
+            if rss is not None:
+                record.peak_rss_delta = peak_rss() - rss
+            self.records.append(record)
+            logger.debug("%s", record)
+
+    def record(self, stage, **fields):
+        record = StageRecord(stage, **fields)
+        self.records.append(record)
+        return record
+
+    def fail(self, stage, error, source=None, table=None):
+        failure = Failure(stage, source, table, f'{type(error).__name__}: {error}')
+        self.failures.append(failure)
+        return failure
+
+    def as_dict(self):
+        return {
+            'started': self.started.isoformat(),
+            'seconds': time.perf_counter() - self._clock,
+            'peak_rss': peak_rss(),
+            'stages': [{**asdict(record), 'rows_per_sec': record.rows_per_sec} for record in self.records],
+            'failures': [asdict(failure) for failure in self.failures],
+        }
+
+    def write_json(self, path):
+        _write_atomic(path, json.dumps(self.as_dict(), indent=2))
+        logger.info("Run report written to %s", path)
+
+    def write_prometheus(self, path):
+        """Write the report in the Prometheus text format, for node exporter's textfile collector."""
+        report = self.as_dict()
+        metrics = {
+            'stage_seconds': ('Wall time of a pipeline stage', 'seconds'),
+            'stage_bytes': ('Bytes downloaded or parsed by a stage', 'bytes'),
+            'stage_peak_rss_delta_bytes': ('Growth of the peak resident memory during a stage', 'peak_rss_delta'),
+            'stage_rows_in': ('Rows into a stage', 'rows_in'),
+            'stage_rows_out': ('Rows out of (or written by) a stage', 'rows_out'),
+            'stage_rows_per_second': ('Rows out per second of stage wall time', 'rows_per_sec'),
+        }
+        lines = []
+        for name, (help_text, field) in metrics.items():
+            samples = [(stage, stage[field]) for stage in report['stages'] if stage[field] is not None]
+            if not samples:
+                continue
+            lines += [f'# HELP {METRIC_PREFIX}_{name} {help_text}.', f'# TYPE {METRIC_PREFIX}_{name} gauge']
+            for stage, value in samples:
+                labels = ','.join(f'{label}="{_escape(stage[label] or "")}"' for label in ('stage', 'source', 'table'))
+                lines.append(f'{METRIC_PREFIX}_{name}{{{labels}}} {value}')
+        if report['failures']:
+            lines += [f'# HELP {METRIC_PREFIX}_failed A source or table skipped because it failed.',
+                      f'# TYPE {METRIC_PREFIX}_failed gauge']
+            for failure in report['failures']:
+                labels = ','.join(f'{label}="{_escape(failure[label] or "")}"'
+                                  for label in ('stage', 'source', 'table'))
+                lines.append(f'{METRIC_PREFIX}_failed{{{labels}}} 1')
+        lines += [
+            f'# HELP {METRIC_PREFIX}_run_failures Sources and tables skipped because they failed.',
+            f'# TYPE {METRIC_PREFIX}_run_failures gauge',
+            f'{METRIC_PREFIX}_run_failures {len(report["failures"])}',
+            f'# HELP {METRIC_PREFIX}_run_seconds Wall time of the whole run.',
+            f'# TYPE {METRIC_PREFIX}_run_seconds gauge',
+            f'{METRIC_PREFIX}_run_seconds {report["seconds"]}',
+            f'# HELP {METRIC_PREFIX}_run_timestamp_seconds When the run started.',
+            f'# TYPE {METRIC_PREFIX}_run_timestamp_seconds gauge',
+            f'{METRIC_PREFIX}_run_timestamp_seconds {self.started.timestamp()}',
+        ]
+        if report['peak_rss'] is not None:
+            lines += [f'# HELP {METRIC_PREFIX}_run_peak_rss_bytes Peak resident memory of the run.',
+                      f'# TYPE {METRIC_PREFIX}_run_peak_rss_bytes gauge',
+                      f'{METRIC_PREFIX}_run_peak_rss_bytes {report["peak_rss"]}']
+        # The collector may read at any moment, so never leave a partial file in place
+        _write_atomic(path, '\n'.join(lines) + '\n')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        f.write(text)
+    os.replace(path + '.tmp', path)
@@ -0,0 +1,415 @@
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+import sqlalchemy
+
+from . import fbref
+
+logger = logging.getLogger(__name__)
+
+# Extra column holding a hash of each row, used to skip rows that haven't changed
+ROW_HASH = 'row_hash'
+BATCH_SIZE = 1000
+KEY_LENGTH = 255
+# SQLite caps bound parameters per statement
+SQLITE_MAX_VARIABLES = 32766
+
+
+@dataclass
+class LoadResult:
+    table: str
+    rows: int
+    written: int
+    deleted: int
+    seconds: float
+    writer: str
+
+    @property
+    def rows_per_sec(self):
+        return self.written / self.seconds if self.seconds else 0.0
+
+
+def hash_rows(df):
+    # hash_pandas_object gives uint64; view it as int64 so it fits a signed BIGINT
+    return pd.util.hash_pandas_object(df, index=False).to_numpy().view('int64')
+
+
+def column_type(series):
+    """SQL type for a new column added to an existing table."""
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return sqlalchemy.Boolean()
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return sqlalchemy.BigInteger()
+    if pd.api.types.is_float_dtype(series.dtype):
+        return sqlalchemy.Float()
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return sqlalchemy.DateTime()
+    return sqlalchemy.Text()
+
+
+def type_family(sql_type=None, dtype=None):
+    """'integer', 'float' or 'text' for a reflected column type or a pandas dtype, None for anything else."""
+    if sql_type is not None:
+        for family, base in (('integer', sqlalchemy.Integer), ('float', sqlalchemy.Float),
+                             ('float', sqlalchemy.Numeric), ('text', sqlalchemy.String)):
+            if isinstance(sql_type, base):
+                return family
+        return None
+    if dtype.kind in 'iub':
+        return 'integer'
+    if dtype.kind == 'f':
+        return 'float'
+    if fbref.is_text(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return 'text'
+    return None
+
+
+# Bytes held by each integer column type, by SQL name or SQLAlchemy's generic type name
+INTEGER_BYTES = {'BOOLEAN': 1, 'TINYINT': 1, 'SMALLINT': 2, 'SMALL_INTEGER': 2, 'MEDIUMINT': 3, 'INTEGER': 4, 'INT': 4,
+                 'BIGINT': 8, 'BIG_INTEGER': 8}
+
+
+def integer_bytes(sql_type):
+    """Width of a reflected integer column type in bytes, None for other types."""
+    return INTEGER_BYTES.get(getattr(sql_type, '__visit_name__', '').upper())
+
+
+def narrow_integers(reflected, df):
+    """Integer columns of the table too narrow for the values ``df`` may hold."""
+    return [column for column in df.columns
+            if column in reflected and type_family(dtype=df[column].dtype) == 'integer'
+            and (integer_bytes(reflected[column]) or 8) < df[column].dtype.itemsize]
+
+
+def index_name(table, columns):
+    return f"ix_{table}_{'_'.join(columns)}"
+
+
+def ensure_indexes(conn, table, indexes):
+    """Create a secondary index on each column tuple in ``indexes`` that ``table`` doesn't have yet."""
+    existing = {tuple(index['column_names']) for index in sqlalchemy.inspect(conn).get_indexes(table)}
+    sql_table = sqlalchemy.Table(table, sqlalchemy.MetaData(), autoload_with=conn)
+    for columns in map(tuple, indexes):
+        if columns not in existing:
+            sqlalchemy.Index(index_name(table, columns), *(sql_table.c[column] for column in columns)).create(conn)
+    return sql_table
+
+
+def ensure_table(conn, df, table, keys, partition=None, add_columns=False, indexes=()):
+    """Create ``table`` with a primary key on ``keys`` unless it already has the right shape.
+
+    Tables left behind by ``to_sql(if_exists='replace')`` have no key, and a page that gains or
+    loses a column, or a column that changes between text and numbers, changes the shape; both
+    are dropped and recreated. With ``add_columns`` a table
+    with the right key keeps its rows instead: columns new in ``df`` are added and columns missing
+    from it are left NULL. ``partition`` is a MySQL ``PARTITION BY`` clause added to the
+    ``CREATE TABLE``; other databases ignore it. ``indexes`` lists column tuples to index.
+    """
+    inspector = sqlalchemy.inspect(conn)
+    quote = conn.dialect.identifier_preparer.quote
+    if inspector.has_table(table):
+        primary_key = inspector.get_pk_constraint(table)['constrained_columns']
+        reflected = {column['name']: column['type'] for column in inspector.get_columns(table)}
+        types = {name: type_family(sql_type=sql_type) for name, sql_type in reflected.items()}
+        columns = set(types)
+        same_types = all(types[column] == type_family(dtype=df[column].dtype) for column in df.columns
+                         if column in types and types[column] and type_family(dtype=df[column].dtype))
+        # An integer column created narrower than the frame's dtype would clamp or reject larger values
+        narrow = narrow_integers(reflected, df)
+        if primary_key == list(keys) and (add_columns or columns == set(df.columns) | {ROW_HASH} and same_types
+                                          and not narrow):
+            for column in df.columns:
+                if column not in columns:
+                    logger.info("Adding column %s to %s", column, table)
+                    conn.execute(sqlalchemy.text(f'ALTER TABLE {quote(table)} ADD COLUMN {quote(column)} '
+                                                 f'{column_type(df[column]).compile(dialect=conn.dialect)}'))
+            # SQLite stores any integer in any integer column and can't alter column types anyway
+            if narrow and conn.dialect.name in ('mysql', 'mariadb'):
+                logger.info("Widening %s in %s", ', '.join(narrow), table)
+                conn.execute(sqlalchemy.text(f'ALTER TABLE {quote(table)} ' + ', '.join(
+                    f'MODIFY COLUMN {quote(column)} {column_type(df[column]).compile(dialect=conn.dialect)}'
+                    for column in narrow)))
+            return ensure_indexes(conn, table, indexes)
+        logger.warning("Recreating %s, its columns, column types or primary key changed", table)
+        conn.execute(sqlalchemy.text(f'DROP TABLE {quote(table)}'))
+
+    # Text keys need a length to be indexable
+    indexed = dict.fromkeys([*keys, *(column for columns in indexes for column in columns)])
+    key_types = {column: sqlalchemy.String(KEY_LENGTH) for column in indexed if fbref.is_text(df[column].dtype)}
+    schema = df.head(0).assign(**{ROW_HASH: pd.Series(dtype='int64')})
+    create = pd.io.sql.get_schema(schema, table, keys=list(keys), con=conn, dtype=key_types)
+    if partition and conn.dialect.name in ('mysql', 'mariadb'):
+        create += f' {partition}'
+    conn.execute(sqlalchemy.text(create))
+    return ensure_indexes(conn, table, indexes)
+
+
+def upsert_statement(conn, sql_table, keys, rows=None):
+    """``INSERT ... ON DUPLICATE KEY UPDATE`` for MySQL, the ``ON CONFLICT`` equivalent for SQLite.
+
+    ``rows`` are rendered as one multi-row VALUES clause; without them the statement is meant
+    for executemany.
+    """
+    updates = [column.name for column in sql_table.columns if column.name not in keys]
+    if conn.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(sql_table) if rows is None else insert(sql_table).values(rows)
+        return stmt.on_conflict_do_update(index_elements=list(keys),
+                                          set_={name: stmt.excluded[name] for name in updates})
+    from sqlalchemy.dialects.mysql import insert
+    stmt = insert(sql_table) if rows is None else insert(sql_table).values(rows)
+    return stmt.on_duplicate_key_update({name: stmt.inserted[name] for name in updates})
+
+
+def records(df):
+    # NaN isn't valid SQL, send NULL
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+class MultiRowInsertWriter:
+    """Upsert rows in chunks of multi-row ``INSERT ... VALUES (...), (...)`` statements."""
+    name = 'multirow'
+
+    def __init__(self, chunksize=BATCH_SIZE):
+        self.chunksize = chunksize
+
+    def write(self, conn, sql_table, keys, df):
+        chunksize = self.chunksize
+        if conn.dialect.name == 'sqlite':
+            chunksize = max(1, min(chunksize, SQLITE_MAX_VARIABLES // len(df.columns)))
+        for start in range(0, len(df), chunksize):
+            conn.execute(upsert_statement(conn, sql_table, keys, records(df.iloc[start:start + chunksize])))
+
+
+def tsv_column(series):
+    """Render a column in LOAD DATA's default text format: backslash escapes and ``\\N`` for NULL."""
+    text = series.astype(str)
+    if not pd.api.types.is_numeric_dtype(series.dtype):
+        for char, escaped in (('\\', '\\\\'), ('\t', '\\t'), ('\n', '\\n'), ('\r', '\\r')):
+            text = text.str.replace(char, escaped, regex=False)
+    return text.mask(series.isna(), '\\N')
+
+
+class LoadDataWriter:
+    """Stream rows to a temporary TSV and ``LOAD DATA LOCAL INFILE ... REPLACE`` it (MySQL/MariaDB).
+
+    Needs ``local_infile`` enabled on the server and ``allow_local_infile`` on the connection.
+    """
+    name = 'load_data'
+
+    def __init__(self, chunksize=10000):
+        self.chunksize = chunksize
+
+    def write(self, conn, sql_table, keys, df):
+        quote = conn.dialect.identifier_preparer.quote
+        fd, path = tempfile.mkstemp(suffix='.tsv')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                for start in range(0, len(df), self.chunksize):
+                    chunk = df.iloc[start:start + self.chunksize]
+                    columns = [tsv_column(chunk[column]) for column in chunk.columns]
+                    lines = columns[0].str.cat(columns[1:], sep='\t') if len(columns) > 1 else columns[0]
+                    f.write('\n'.join(lines))
+                    f.write('\n')
+            columns = ', '.join(quote(column) for column in df.columns)
+            # Rows are whole, so REPLACE on the primary key is the upsert
+            conn.exec_driver_sql(
+                f"LOAD DATA LOCAL INFILE '{path}' REPLACE INTO TABLE {quote(sql_table.name)} CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({columns})"
+            )
+        finally:
+            os.remove(path)
+
+
+class FallbackWriter:
+    """Try each writer in turn, dropping one for the rest of the run once it fails."""
+
+    def __init__(self, *writers):
+        self.writers = list(writers)
+
+    @property
+    def name(self):
+        return self.writers[0].name
+
+    def write(self, conn, sql_table, keys, df):
+        while True:
+            writer = self.writers[0]
+            if len(self.writers) == 1:
+                return writer.write(conn, sql_table, keys, df)
+            try:
+                with conn.begin_nested():
+                    return writer.write(conn, sql_table, keys, df)
+            except sqlalchemy.exc.DBAPIError as error:
+                logger.warning("%s writer failed on %s, falling back: %s", writer.name, sql_table.name, error)
+                self.writers.pop(0)
+
+
+def default_writer(engine):
+    if engine.dialect.name in ('mysql', 'mariadb'):
+        return FallbackWriter(LoadDataWriter(), MultiRowInsertWriter())
+    return MultiRowInsertWriter()
+
+
+def upsert(engine, df, table, keys, writer=None, indexes=()):
+    """Bring ``table`` in line with ``df`` writing only new and changed rows.
+
+    Rows are compared on a hash of their contents against what is already stored. Changed rows
+    go through ``writer`` (see ``default_writer``) and keys no longer in ``df`` are deleted.
+    ``indexes`` lists column tuples to add secondary indexes on.
+    """
+    writer = writer or default_writer(engine)
+    keys = list(keys)
+    df = df.assign(**{ROW_HASH: hash_rows(df)})
+    # Neither writer round-trips numpy bools cleanly into TINYINT
+    df = df.astype({column: 'int8' for column in df.columns if df[column].dtype == bool})
+    with engine.begin() as conn:
+        sql_table = ensure_table(conn, df, table, keys, indexes=indexes)
+
+        stored = pd.read_sql(sqlalchemy.select(*(sql_table.c[key] for key in keys), sql_table.c[ROW_HASH]), conn)
+        stored = stored.set_index(keys)[ROW_HASH].astype('Int64')
+        current = pd.Series(df[ROW_HASH].to_numpy(), index=pd.MultiIndex.from_frame(df[keys]) if len(keys) > 1
+                            else pd.Index(df[keys[0]]))
+        changed = (current != stored.reindex(current.index)).fillna(True).to_numpy(dtype=bool)
+        stale = stored.index.difference(current.index)
+
+        started = time.perf_counter()
+        rows = df[changed]
+        if len(rows):
+            writer.write(conn, sql_table, keys, rows)
+        if len(stale):
+            key_columns = sqlalchemy.tuple_(*(sql_table.c[key] for key in keys)) if len(keys) > 1 else sql_table.c[keys[0]]
+            stale = stale.tolist()
+            for start in range(0, len(stale), BATCH_SIZE):
+                conn.execute(sqlalchemy.delete(sql_table).where(key_columns.in_(stale[start:start + BATCH_SIZE])))
+
+    result = LoadResult(table, len(df), len(rows), len(stale), time.perf_counter() - started, writer.name)
+    logger.info("%s: %d rows written, %d unchanged, %d deleted in %.2fs (%.0f rows/s, %s)", table, result.written,
+                result.rows - result.written, result.deleted, result.seconds, result.rows_per_sec, result.writer)
+    return result
+
+
+def append(engine, df, table, keys, writer=None, partition=None, add_columns=False):
+    """Upsert ``df`` into ``table`` without comparing or deleting anything, for append-only history.
+
+    Rows already stored under the same key are overwritten, so re-running a batch is harmless.
+    ``partition`` and ``add_columns`` are passed on to ``ensure_table``.
+    """
+    writer = writer or default_writer(engine)
+    df = df.assign(**{ROW_HASH: hash_rows(df)})
+    df = df.astype({column: 'int8' for column in df.columns if df[column].dtype == bool})
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        sql_table = ensure_table(conn, df, table, keys, partition=partition, add_columns=add_columns)
+        if len(df):
+            writer.write(conn, sql_table, list(keys), df)
+    result = LoadResult(table, len(df), len(df), 0, time.perf_counter() - started, writer.name)
+    logger.debug("%s: %d rows appended in %.2fs (%.0f rows/s, %s)", table, result.written, result.seconds,
+                 result.rows_per_sec, result.writer)
+    return result
+
+
+STAGING_SUFFIX = '__staging'
+OLD_SUFFIX = '__old'
+
+
+class StagedLoad:
+    """Load into shadow copies of the live tables, then publish them all at once.
+
+    Each ``upsert`` copies the live table into ``<table>__staging`` and applies the changes there,
+    so readers never see a half-loaded table. ``publish`` swaps every staged table in with a single
+    ``RENAME TABLE`` (one transaction on SQLite); ``discard`` throws the shadow tables away. Used as
+    a context manager it publishes on success and discards on error.
+    """
+
+    def __init__(self, engine, writer=None):
+        self.engine = engine
+        self.writer = writer or default_writer(engine)
+        self.tables = []
+        self.results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.publish()
+        else:
+            self.discard()
+        return False
+
+    def _quote(self, name):
+        return self.engine.dialect.identifier_preparer.quote(name)
+
+    def _copy_live(self, conn, table, staging):
+        conn.execute(sqlalchemy.text(f'DROP TABLE IF EXISTS {self._quote(staging)}'))
+        if not sqlalchemy.inspect(conn).has_table(table):
+            return
+        if conn.dialect.name == 'sqlite':
+            # No CREATE TABLE ... LIKE; copy the reflected definition, keeping the primary key
+            live = sqlalchemy.Table(table, sqlalchemy.MetaData(), autoload_with=conn)
+            copy = live.to_metadata(sqlalchemy.MetaData(), name=staging)
+            copy.indexes.clear()
+            copy.create(conn)
+        else:
+            conn.execute(sqlalchemy.text(f'CREATE TABLE {self._quote(staging)} LIKE {self._quote(table)}'))
+        conn.execute(sqlalchemy.text(f'INSERT INTO {self._quote(staging)} SELECT * FROM {self._quote(table)}'))
+
+    def upsert(self, df, table, keys, indexes=()):
+        staging = table + STAGING_SUFFIX
+        with self.engine.begin() as conn:
+            self._copy_live(conn, table, staging)
+        result = upsert(self.engine, df, staging, keys, writer=self.writer, indexes=indexes)
+        result.table = table
+        self.tables.append(table)
+        self.results.append(result)
+        return result
+
+    def publish(self):
+        if not self.tables:
+            return
+        with self.engine.begin() as conn:
+            if conn.dialect.name == 'sqlite':
+                # pysqlite leaves DDL in autocommit unless a transaction is already open
+                conn.exec_driver_sql('BEGIN')
+            inspector = sqlalchemy.inspect(conn)
+            live = [table for table in self.tables if inspector.has_table(table)]
+            for table in live:
+                conn.execute(sqlalchemy.text(f'DROP TABLE IF EXISTS {self._quote(table + OLD_SUFFIX)}'))
+            renames = [(table, table + OLD_SUFFIX) for table in live]
+            renames += [(table + STAGING_SUFFIX, table) for table in self.tables]
+            if conn.dialect.name == 'sqlite':
+                for old, new in renames:
+                    conn.execute(sqlalchemy.text(f'ALTER TABLE {self._quote(old)} RENAME TO {self._quote(new)}'))
+            else:
+                conn.execute(sqlalchemy.text('RENAME TABLE ' + ', '.join(
+                    f'{self._quote(old)} TO {self._quote(new)}' for old, new in renames)))
+            for table in live:
+                conn.execute(sqlalchemy.text(f'DROP TABLE {self._quote(table + OLD_SUFFIX)}'))
+            if conn.dialect.name == 'sqlite':
+                self._rename_indexes(conn)
+        logger.info("Published %d tables: %s", len(self.tables), ', '.join(self.tables))
+        self.tables = []
+
+    def _rename_indexes(self, conn):
+        # SQLite index names are global and survive a table rename, so indexes made on the staging
+        # table are rebuilt under the live table's name once the old table (and its indexes) is gone
+        inspector = sqlalchemy.inspect(conn)
+        for table in self.tables:
+            for index in inspector.get_indexes(table):
+                columns = index['column_names']
+                if index['name'] == index_name(table + STAGING_SUFFIX, columns):
+                    conn.execute(sqlalchemy.text(f'DROP INDEX {self._quote(index["name"])}'))
+                    conn.execute(sqlalchemy.text(
+                        f'CREATE INDEX {self._quote(index_name(table, columns))} ON {self._quote(table)} '
+                        f'({", ".join(self._quote(column) for column in columns)})'))
+
+    def discard(self):
+        with self.engine.begin() as conn:
+            for table in self.tables:
+                conn.execute(sqlalchemy.text(f'DROP TABLE IF EXISTS {self._quote(table + STAGING_SUFFIX)}'))
+        logger.warning("Discarded %d staged tables, live tables left untouched", len(self.tables))
+        self.tables = []
@@ -0,0 +1,226 @@
+import difflib
+import logging
+import re
+
+import pandas as pd
+import sqlalchemy
+
+logger = logging.getLogger(__name__)
+
+MAP_TABLE = 'player_id_map'
+# Highest player_id ever handed out. player_id_map only holds current players, so this keeps ids of
+# players who left from being given to new ones.
+LAST_ID_TABLE = 'player_id_last'
+# Minimum similarity for a fuzzy match, and how far ahead of the runner-up it has to be
+FUZZY_THRESHOLD = 0.85
+FUZZY_MARGIN = 0.05
+
+# Characters NFKD doesn't decompose into ASCII
+_FOLD = str.maketrans({'ø': 'o', 'Ø': 'O', 'æ': 'ae', 'Æ': 'AE', 'ß': 'ss', 'ł': 'l', 'Ł': 'L',
+                       'đ': 'd', 'Đ': 'D', 'ð': 'd', 'þ': 'th', 'ı': 'i'})
+
+# Folded team names from FPL, Understat and FBRef mapped to one spelling
+TEAM_ALIASES = {
+    'bournemouth': 'bournemouth', 'afc bournemouth': 'bournemouth',
+    'brighton': 'brighton', 'brighton and hove albion': 'brighton', 'brighton hove albion': 'brighton',
+    'ipswich': 'ipswich', 'ipswich town': 'ipswich',
+    'leeds': 'leeds', 'leeds united': 'leeds',
+    'leicester': 'leicester', 'leicester city': 'leicester',
+    'luton': 'luton', 'luton town': 'luton',
+    'man city': 'man city', 'manchester city': 'man city',
+    'man utd': 'man utd', 'manchester united': 'man utd', 'manchester utd': 'man utd',
+    'newcastle': 'newcastle', 'newcastle united': 'newcastle', 'newcastle utd': 'newcastle',
+    'norwich': 'norwich', 'norwich city': 'norwich',
+    'nott m forest': 'nottm forest', 'nottingham forest': 'nottm forest', 'nott ham forest': 'nottm forest',
+    'sheffield utd': 'sheffield utd', 'sheffield united': 'sheffield utd',
+    'spurs': 'spurs', 'tottenham': 'spurs', 'tottenham hotspur': 'spurs',
+    'west brom': 'west brom', 'west bromwich albion': 'west brom',
+    'west ham': 'west ham', 'west ham united': 'west ham',
+    'wolves': 'wolves', 'wolverhampton wanderers': 'wolves',
+}
+
+# FPL element types, Understat position letters and FBRef Pos codes on one scale
+POSITIONS = {'GK': 'GK', 'GKP': 'GK', 'D': 'DF', 'DF': 'DF', 'DEF': 'DF', 'M': 'MF', 'MF': 'MF', 'MID': 'MF',
+             'F': 'FW', 'FW': 'FW', 'FWD': 'FW'}
+
+
+def fold(names):
+    """Lower-case ASCII with accents and punctuation stripped."""
+    return (names.astype(object).fillna('').astype(str).str.translate(_FOLD).str.normalize('NFKD')
+            .str.encode('ascii', 'ignore').str.decode('ascii').str.lower()
+            .str.replace(r'[^a-z0-9]+', ' ', regex=True).str.strip())
+
+
+def name_key(names):
+    """Folded name with its tokens sorted, so 'Son Heung-min' and 'Heung-Min Son' agree."""
+    return fold(names).str.split().map(sorted).str.join(' ')
+
+
+def team_key(teams):
+    folded = fold(teams)
+    return folded.map(TEAM_ALIASES).fillna(folded)
+
+
+def position_set(positions):
+    return positions.astype(object).fillna('').astype(str).map(
+        lambda value: frozenset(POSITIONS[code] for code in re.split(r'[\s,]+', value) if code in POSITIONS))
+
+
+def _fpl_index(fpl):
+    # Every name an FPL player might go by elsewhere: full name, web name, first + last token
+    full = fold(fpl['player'])
+    variants = [fpl['player'], fpl['web_name'], full.str.split().str[0] + ' ' + full.str.split().str[-1]]
+    index = pd.concat([pd.DataFrame({'fpl_id': fpl['fpl_id'], 'team': fpl['team'], 'name_key': name_key(names)})
+                       for names in variants], ignore_index=True)
+    return index[index['name_key'] != ''].drop_duplicates()
+
+
+def _unique_pairs(pairs):
+    return pairs[~pairs['source_id'].duplicated(keep=False) & ~pairs['fpl_id'].duplicated(keep=False)]
+
+
+def _similarity(a, b):
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    if tokens_a and tokens_b and (tokens_a <= tokens_b or tokens_b <= tokens_a):
+        return 0.95
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+def match_players(fpl, source, threshold=FUZZY_THRESHOLD):
+    """Match ``source`` rows to FPL players.
+
+    ``fpl`` has fpl_id, player, web_name, team and positions; ``source`` has source_id, name,
+    team and positions. Exact matches on (team, sorted-token name) are resolved in bulk first, then
+    exact name matches across teams (transfers), then a fuzzy comparison restricted to
+    position-compatible players of the same team. Returns source_id, fpl_id, method and score.
+    """
+    index = _fpl_index(fpl)
+    source = source.assign(name_key=name_key(source['name']))
+    found = []
+
+    pairs = _unique_pairs(source.merge(index, on=['team', 'name_key'])[['source_id', 'fpl_id']].drop_duplicates())
+    found.append(pairs.assign(method='exact_team', score=1.0))
+
+    rest = source[~source['source_id'].isin(pairs['source_id'])]
+    free = index[~index['fpl_id'].isin(pairs['fpl_id'])]
+    # Only names that point at a single player are safe without the team
+    owners = free.drop_duplicates(['name_key', 'fpl_id'])['name_key']
+    unambiguous = free[~free['name_key'].isin(owners[owners.duplicated()])]
+    pairs = _unique_pairs(rest.merge(unambiguous, on='name_key')[['source_id', 'fpl_id']].drop_duplicates())
+    found.append(pairs.assign(method='exact_name', score=1.0))
+
+    rest = rest[~rest['source_id'].isin(pairs['source_id'])]
+    free = free[~free['fpl_id'].isin(pairs['fpl_id'])]
+    positions = fpl.set_index('fpl_id')['positions']
+    candidates = {team: block for team, block in free.groupby('team')}
+
+    fuzzy = []
+    for row in rest.itertuples(index=False):
+        block = candidates.get(row.team)
+        if block is None:
+            continue
+        scores = {}
+        for fpl_id, key in zip(block['fpl_id'], block['name_key']):
+            if row.positions and positions[fpl_id] and not row.positions & positions[fpl_id]:
+                continue
+            scores[fpl_id] = max(scores.get(fpl_id, 0.0), _similarity(row.name_key, key))
+        ranked = sorted(scores.values(), reverse=True)
+        if ranked and ranked[0] >= threshold and (len(ranked) == 1 or ranked[0] - ranked[1] >= FUZZY_MARGIN):
+            fuzzy.append((row.source_id, max(scores, key=scores.get), 'fuzzy', ranked[0]))
+    fuzzy = pd.DataFrame(fuzzy, columns=['source_id', 'fpl_id', 'method', 'score'])
+    # Each side can only be matched once; keep the closest pairing
+    fuzzy = fuzzy.sort_values('score', ascending=False).drop_duplicates('fpl_id').drop_duplicates('source_id')
+
+    return pd.concat([frame for frame in (*found, fuzzy) if len(frame)] or [fuzzy], ignore_index=True)
+
+
+def read_player_map(engine):
+    if not sqlalchemy.inspect(engine).has_table(MAP_TABLE):
+        return None
+    return pd.read_sql_table(MAP_TABLE, engine).drop(columns='row_hash', errors='ignore')
+
+
+def read_last_player_id(engine):
+    if not sqlalchemy.inspect(engine).has_table(LAST_ID_TABLE):
+        return 0
+    with engine.connect() as conn:
+        return conn.execute(sqlalchemy.text(f'SELECT MAX(last_id) FROM {LAST_ID_TABLE}')).scalar() or 0
+
+
+def last_id_frame(player_map, last_id=0):
+    """The ``player_id_last`` row to store with ``player_map``."""
+    highest = int(player_map['player_id'].max()) if len(player_map) else 0
+    return pd.DataFrame({'sequence': ['player_id'], 'last_id': [max(int(last_id), highest)]})
+
+
+def build_player_map(players_fpl, players_understat, fbref_standard, previous=None, last_id=0):
+    """Resolve every FPL player to its Understat id and FBRef Player/Squad.
+
+    Rows from ``previous`` (the stored ``player_id_map``) are kept as long as the FPL player and the
+    matched source rows are still there, so only new or unmatched players are matched each run.
+    New players get ids above ``last_id`` (see ``read_last_player_id``) and above every id in
+    ``previous``, so an id is never reused.
+    """
+    fpl = pd.DataFrame({
+        'fpl_id': players_fpl['id'],
+        'player': players_fpl['player'],
+        'web_name': players_fpl['web_name'],
+        'team': team_key(players_fpl['team_name']),
+        'positions': position_set(players_fpl['position']),
+    })
+    understat = pd.DataFrame({
+        'source_id': players_understat['id'].astype(str),
+        'name': players_understat['player_name'],
+        # Players who moved clubs mid-season list every team, block on each of them
+        'team': players_understat['team_title'].str.split(','),
+        'positions': position_set(players_understat['position']),
+    }).explode('team')
+    understat['team'] = team_key(understat['team'])
+    fbref = pd.DataFrame({
+        'source_id': fbref_standard['Player'] + '\x1f' + fbref_standard['Squad'],
+        'name': fbref_standard['Player'],
+        'team': team_key(fbref_standard['Squad']),
+        'positions': position_set(fbref_standard['Pos']),
+    })
+
+    result = fpl[['fpl_id', 'player']].copy()
+    result['player_id'] = pd.array([pd.NA] * len(result), dtype='Int64')
+    result['understat_id'] = result['understat_method'] = None
+    result['fbref_player'] = result['fbref_squad'] = result['fbref_method'] = None
+
+    if previous is not None:
+        # FPL reuses ids between seasons, so only trust a previous row if the name still agrees
+        kept = previous.merge(result[['fpl_id', 'player']], on=['fpl_id', 'player']).set_index('fpl_id')
+        kept.loc[~kept['understat_id'].isin(understat['source_id']), ['understat_id', 'understat_method']] = None
+        fbref_ids = kept['fbref_player'] + '\x1f' + kept['fbref_squad']
+        kept.loc[~fbref_ids.isin(fbref['source_id']), ['fbref_player', 'fbref_squad', 'fbref_method']] = None
+        result = result.set_index('fpl_id')
+        result.update(kept[['player_id', 'understat_id', 'understat_method', 'fbref_player', 'fbref_squad',
+                            'fbref_method']])
+        result = result.reset_index()
+
+    for prefix, source in (('understat', understat), ('fbref', fbref)):
+        claimed = result['fbref_player'] + '\x1f' + result['fbref_squad'] if prefix == 'fbref' else result['understat_id']
+        open_fpl = fpl[result[f'{prefix}_method'].isna().to_numpy()]
+        open_source = source[~source['source_id'].isin(claimed.dropna())]
+        matches = match_players(open_fpl, open_source).set_index('fpl_id')
+        found = result['fpl_id'].map(matches['source_id']).dropna().astype(str)
+        method = result['fpl_id'].map(matches['method'])
+        if prefix == 'fbref':
+            parts = found.str.split('\x1f', n=1)
+            result['fbref_player'] = result['fbref_player'].fillna(parts.str[0])
+            result['fbref_squad'] = result['fbref_squad'].fillna(parts.str[1])
+        else:
+            result['understat_id'] = result['understat_id'].fillna(found)
+        result[f'{prefix}_method'] = result[f'{prefix}_method'].fillna(method)
+        logger.info("%s: %d players carried over, %s, %d FPL players unmatched", prefix,
+                    len(result) - len(open_fpl), matches['method'].value_counts().to_dict(),
+                    result[f'{prefix}_method'].isna().sum())
+
+    # New FPL players get the next id never handed out, even if the player who had the highest one left
+    missing = result['player_id'].isna()
+    ids = result['player_id'] if previous is None else pd.concat([result['player_id'], previous['player_id']])
+    start = max(int(last_id), int(ids.max()) if ids.notna().any() else 0) + 1
+    result.loc[missing, 'player_id'] = range(start, start + missing.sum())
+    return result[['player_id', 'fpl_id', 'player', 'understat_id', 'understat_method', 'fbref_player',
+                   'fbref_squad', 'fbref_method']]
@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import logging
+import time
+
+import aiohttp
+import pandas as pd
+import sqlalchemy
+
+from . import backfill, cli, db, fetch, httpcache, loader
+
+logger = logging.getLogger(__name__)
+
+SHOTS_TABLE = 'shots_understat'
+# Understat shot fields kept, pinned so the table keeps its shape
+SHOT_COLUMNS = ['id', 'match_id', 'season', 'date', 'minute', 'h_a', 'h_team', 'a_team', 'h_goals', 'a_goals',
+                'player_id', 'player', 'player_assisted', 'situation', 'shotType', 'lastAction', 'result', 'X', 'Y',
+                'xG']
+SHOT_DTYPES = {'id': 'int32', 'match_id': 'int32', 'season': 'int16', 'minute': 'int16', 'h_goals': 'int8',
+               'a_goals': 'int8', 'player_id': 'int32', 'X': 'float32', 'Y': 'float32', 'xG': 'float32'}
+
+WORKERS = 8
+RATE = 4.0
+# Shots per database write; with the bounded queues this is what caps memory
+BATCH_SHOTS = 5000
+QUEUE_SIZE = 64
+
+
+def shots_frame(league, shots):
+    df = pd.DataFrame.from_records(shots, columns=SHOT_COLUMNS)
+    for column, dtype in SHOT_DTYPES.items():
+        df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+    df['date'] = pd.to_datetime(df['date'])
+    df.insert(0, 'league', league)
+    return df
+
+
+def loaded_matches(engine):
+    if not sqlalchemy.inspect(engine).has_table(SHOTS_TABLE):
+        return set()
+    with engine.connect() as conn:
+        return set(conn.execute(sqlalchemy.text(f'SELECT DISTINCT match_id FROM {SHOTS_TABLE}')).scalars())
+
+
+async def load_shots(engine, league, seasons, cache=None, offline=False, workers=WORKERS, rate=RATE,
+                     batch_size=BATCH_SHOTS, failures=None):
+    """Stream every shot of ``league`` in ``seasons`` into ``shots_understat``.
+
+    A producer lists each season's played matches, ``workers`` fetch match shots and the loop here
+    appends them every ``batch_size`` shots. Both queues are bounded, so at most a batch and a few
+    matches are held in memory however many seasons are pulled. Matches already in the table are skipped.
+
+    The first failed request raises, unless a ``failures`` dict is passed: the season or match is then
+    skipped and its exception stored under ``<league>/<season>`` or ``match/<id>``. Skipped matches
+    aren't in the table, so the next run fetches them again.
+    """
+    done = loaded_matches(engine)
+    matches = asyncio.Queue(QUEUE_SIZE)
+    shots = asyncio.Queue(QUEUE_SIZE)
+    writer = loader.default_writer(engine)
+
+    async with aiohttp.ClientSession(connector=fetch.connector(workers)) as session:
+        fetcher = fetch.Fetcher(session, host_limits={'understat.com': workers}, cache=cache, offline=offline,
+                                rate_limits={'understat.com': rate})
+        understat = fetcher.understat()
+
+        async def produce():
+            for season in seasons:
+                try:
+                    results = await understat.get_league_results(league, season)
+                except Exception as error:
+                    if failures is None:
+                        await shots.put(error)
+                        break
+                    logger.error("Listing %s %d matches failed, skipping the season: %r", league, season, error)
+                    failures[f'{league}/{season}'] = error
+                    continue
+                todo = [result['id'] for result in results if int(result['id']) not in done]
+                logger.info("%s %d: %d matches, %d to fetch", league, season, len(results), len(todo))
+                for match_id in todo:
+                    await matches.put(match_id)
+            for _ in range(workers):
+                await matches.put(None)
+
+        async def fetch_shots():
+            while (match_id := await matches.get()) is not None:
+                try:
+                    match = await understat.get_match_shots(match_id)
+                except Exception as error:
+                    if failures is None:
+                        # Hand the failure to the writer loop so it stops instead of waiting on this worker
+                        await shots.put(error)
+                        return
+                    logger.error("Fetching shots of match %s failed, skipping it: %r", match_id, error)
+                    failures[f'match/{match_id}'] = error
+                    continue
+                await shots.put(match['h'] + match['a'])
+            await shots.put(None)
+
+        tasks = [asyncio.create_task(produce())] + [asyncio.create_task(fetch_shots()) for _ in range(workers)]
+        started = time.perf_counter()
+        total = finished = 0
+        batch = []
+        try:
+            while finished < workers:
+                item = await shots.get()
+                if isinstance(item, Exception):
+                    raise item
+                if item is None:
+                    finished += 1
+                else:
+                    batch.extend(item)
+                if len(batch) >= batch_size or (finished == workers and batch):
+                    # The write blocks, keep fetching meanwhile
+                    await asyncio.to_thread(loader.append, engine, shots_frame(league, batch), SHOTS_TABLE, ['id'],
+                                            writer)
+                    total += len(batch)
+                    batch = []
+                    elapsed = time.perf_counter() - started
+                    logger.info("%s: %d shots loaded (%.0f shots/s)", SHOTS_TABLE, total, total / elapsed)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    seconds = time.perf_counter() - started
+    logger.info("Understat shots: %d shots in %.1fs (%.0f shots/s, %d requests)", total, seconds,
+                total / seconds if seconds else 0.0, fetcher.requests)
+    return total
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Load Understat shot data into shots_understat")
+    parser.add_argument('--league', default='EPL', choices=list(fetch.LEAGUES))
+    parser.add_argument('--seasons', required=True, type=backfill.parse_seasons,
+                        help="starting years, e.g. 2017-2021 or 2019,2021")
+    cli.add_common_arguments(parser)
+    parser.add_argument('--workers', type=int, default=WORKERS, help="matches fetched at once")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else httpcache.ResponseCache(args.cache_dir)
+    engine = db.create_engine(args.db_url, args.dbcreds)
+    asyncio.run(load_shots(engine, args.league, args.seasons, cache=cache, workers=args.workers))
@@ -0,0 +1,105 @@
+import datetime
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from . import fbref
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = 'snapshots'
+COMPRESSION = 'zstd'
+INT32 = np.iinfo(np.int32)
+
+
+def compact(df):
+    """Compact dtypes for ``df``: numeric strings become numbers, repetitive text a categorical.
+
+    Integers are stored as 32 bits, or 64 where they don't fit, rather than the smallest width each
+    week's values happen to fit, so one column keeps one type from week to week.
+    """
+    df = df.copy()
+    for column in df.columns:
+        series = df[column]
+        if fbref.is_text(series.dtype):
+            numbers = pd.to_numeric(series, errors='coerce')
+            if series.notna().any() and numbers.notna().sum() == series.notna().sum():
+                series = numbers
+            elif series.nunique() < len(series) / 2:
+                df[column] = series.astype('category')
+                continue
+        if pd.api.types.is_integer_dtype(series.dtype):
+            width = 'int32' if series.dropna().between(INT32.min, INT32.max).all() else 'int64'
+            # Nullable integers stay nullable
+            nullable = isinstance(series.dtype, pd.api.extensions.ExtensionDtype)
+            series = series.astype(width.capitalize() if nullable else width)
+        elif pd.api.types.is_float_dtype(series.dtype):
+            series = series.astype('float32')
+        df[column] = series
+    return df
+
+
+def write_snapshot(frames, date=None, directory=SNAPSHOT_DIR):
+    """Write each frame in ``frames`` (name -> DataFrame) to ``<directory>/date=YYYY-MM-DD/<name>.parquet``.
+
+    Files are written to a temporary name and moved into place, so a partition never holds a
+    half-written file. Rerunning on the same day replaces that day's files.
+    """
+    date = date or datetime.date.today()
+    partition = os.path.join(directory, f'date={date.isoformat()}')
+    os.makedirs(partition, exist_ok=True)
+    size = 0
+    for name, df in frames.items():
+        path = os.path.join(partition, f'{name}.parquet')
+        compact(df).to_parquet(path + '.tmp', engine='pyarrow', compression=COMPRESSION, index=False)
+        os.replace(path + '.tmp', path)
+        size += os.path.getsize(path)
+    logger.info("Snapshot of %d frames written to %s (%.1f MB)", len(frames), partition, size / 1024 ** 2)
+    return partition
+
+
+def snapshot_dates(directory=SNAPSHOT_DIR, start=None, end=None):
+    """Dates with a snapshot partition, oldest first, optionally limited to ``start``..``end`` inclusive."""
+    if not os.path.isdir(directory):
+        return []
+    dates = sorted(datetime.date.fromisoformat(entry[len('date='):]) for entry in os.listdir(directory)
+                   if entry.startswith('date='))
+    return [date for date in dates if (start is None or date >= start) and (end is None or date <= end)]
+
+
+def read_snapshots(name, columns=None, start=None, end=None, directory=SNAPSHOT_DIR):
+    """Load ``name`` from every snapshot between ``start`` and ``end`` with a ``date`` column added.
+
+    Only the partitions in range and the requested ``columns`` are read, and files are memory
+    mapped rather than copied into memory first.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tables, categorical = [], set()
+    for date in snapshot_dates(directory, start, end):
+        path = os.path.join(directory, f'date={date.isoformat()}', f'{name}.parquet')
+        if not os.path.exists(path):
+            continue
+        # A requested column that week's file doesn't have comes back as nulls
+        present = set(pq.read_schema(path).names)
+        table = pq.read_table(path, columns=[column for column in columns if column in present]
+                              if columns is not None else None, memory_map=True)
+        for column in columns or []:
+            if column not in present:
+                table = table.append_column(column, pa.nulls(table.num_rows))
+        if columns is not None:
+            table = table.select(columns)
+        # A column can be categorical one week and plain text the next, and Arrow won't merge the two
+        for index, field in enumerate(table.schema):
+            if pa.types.is_dictionary(field.type):
+                categorical.add(field.name)
+                table = table.set_column(index, field.name, table.column(index).cast(field.type.value_type))
+        tables.append(table.append_column('date', pa.array([date] * table.num_rows, pa.date32())))
+    if not tables:
+        return pd.DataFrame(columns=[*(columns or []), 'date'])
+    # Weeks can differ in columns, categories or widths, widen them to a common schema
+    df = pa.concat_tables(tables, promote_options='permissive').to_pandas(date_as_object=False)
+    return df.astype({column: 'category' for column in categorical})
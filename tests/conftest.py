@@ -0,0 +1,9 @@
+import pytest
+import sqlalchemy
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = sqlalchemy.create_engine(f'sqlite:///{tmp_path / "test.db"}')
+    yield engine
+    engine.dispose()
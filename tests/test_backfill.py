@@ -0,0 +1,37 @@
+import os
+
+import pandas as pd
+import pytest
+
+from scrapepl import backfill, fbref, loader
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+@pytest.mark.parametrize('value, expected', [('2017-2019', [2017, 2018, 2019]), ('2019,2021', [2019, 2021]),
+                                             ('2020', [2020])])
+def test_parse_seasons(value, expected):
+    assert backfill.parse_seasons(value) == expected
+
+
+def frames():
+    with open(os.path.join(FIXTURES, 'stats_standard.html'), 'rb') as f:
+        return fbref.transform_page(f.read(), [spec for spec in fbref.specs_for('stats')
+                                               if spec.name == 'playerstandard'])
+
+
+def test_load_cell(engine):
+    understat = [{'id': '1250', 'player_name': 'Mohamed Salah', 'goals': '23'}]
+    writer = loader.default_writer(engine)
+
+    rows = backfill.load_cell(engine, writer, 'EPL', 2021, understat, frames())
+    # A later season with a column FBRef didn't have before
+    later = {'playerstandard': frames()['playerstandard'].assign(npxGPerShot=0.1)}
+    rows += backfill.load_cell(engine, writer, 'EPL', 2022, understat, later)
+
+    assert rows == 8
+    stored = pd.read_sql_table('playerstandard_history', engine)
+    assert stored.groupby('season').size().to_dict() == {2021: 3, 2022: 3}
+    assert stored.loc[stored['season'] == 2021, 'npxGPerShot'].isna().all()
+    players = pd.read_sql_table('players_understat_history', engine)
+    assert players[['league', 'season', 'id']].values.tolist() == [['EPL', 2021, '1250'], ['EPL', 2022, '1250']]
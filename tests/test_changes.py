@@ -0,0 +1,43 @@
+import json
+import os
+
+from scrapepl import changes
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def test_payload_hashes(tmp_path):
+    path = str(tmp_path / 'state' / 'hashes.json')
+    hashes = changes.PayloadHashes(path)
+
+    assert hashes.changed({'fpl': 'a', 'fbref/stats': 'b'}) == {'fpl', 'fbref/stats'}
+    hashes.update({'fpl': 'a', 'fbref/stats': 'b'})
+
+    reloaded = changes.PayloadHashes(path)
+    assert reloaded.changed({'fpl': 'a', 'fbref/stats': 'c', 'understat': 'd'}) == {'fbref/stats', 'understat'}
+    with open(path) as f:
+        assert json.load(f) == {'fpl': 'a', 'fbref/stats': 'b'}
+
+
+def test_payload_hashes_ignores_a_broken_file(tmp_path):
+    path = tmp_path / 'hashes.json'
+    path.write_text('{not json')
+
+    assert changes.PayloadHashes(str(path)).changed({'fpl': 'a'}) == {'fpl'}
+
+
+def test_fpl_digest_ignores_keys_players_frame_doesnt_read():
+    payload = {'elements': [{'id': 1, 'now_cost': 130}], 'element_types': [], 'teams': [], 'events': [1]}
+
+    assert changes.fpl_digest(payload) == changes.fpl_digest({**payload, 'events': [1, 2]})
+    assert changes.fpl_digest(payload) != changes.fpl_digest({**payload, 'elements': [{'id': 1, 'now_cost': 125}]})
+
+
+def test_fbref_digest_only_hashes_stats_tables():
+    with open(os.path.join(FIXTURES, 'stats_standard.html'), 'rb') as f:
+        html = f.read()
+    retitled = html.replace(b'<title>Premier League Stats', b'<title>Premier League Stats 2021-2022')
+    scored = html.replace(b'<td>23</td>', b'<td>24</td>', 1)
+
+    assert changes.fbref_digest(html, 'stats') == changes.fbref_digest(retitled, 'stats')
+    assert changes.fbref_digest(html, 'stats') != changes.fbref_digest(scored, 'stats')
@@ -0,0 +1,75 @@
+import json
+
+import pandas as pd
+import pytest
+
+from scrapepl import cli, fetch, fpl, httpcache
+
+PAYLOAD = {
+    'elements': [{'id': 1, 'element_type': 3, 'first_name': 'Mohamed', 'second_name': 'Salah', 'photo': '1.jpg',
+                  'team': 1, 'web_name': 'Salah', 'points_per_game': '8.7', 'now_cost': 130, 'clean_sheets': 12}],
+    'element_types': [{'id': 3, 'plural_name_short': 'MID'}],
+    'teams': [{'id': 1, 'name': 'Liverpool'}],
+    'events': [{'id': 1, 'deadline_time': '2021-08-13T17:30:00Z', 'is_current': True}],
+}
+
+
+@pytest.fixture
+def argv(tmp_path):
+    """Options for an offline FPL-only run whose report, hashes and snapshots all go under ``tmp_path``."""
+    cache = httpcache.ResponseCache(str(tmp_path / 'cache'))
+    cache.put(fetch.FPL_URL, json.dumps(PAYLOAD).encode())
+    return ['--offline', '--cache-dir', str(tmp_path / 'cache'), '--sources', 'fpl', '--no-fpl-history',
+            '--db-url', f'sqlite:///{tmp_path / "test.db"}', '--hash-file', str(tmp_path / 'hashes.json'),
+            '--snapshot-dir', str(tmp_path / 'snapshots'), '--report', str(tmp_path / 'report.json'),
+            '--prometheus', str(tmp_path / 'scrapepl.prom')]
+
+
+def option(argv, name, value):
+    argv = list(argv)
+    argv[argv.index(name) + 1] = value
+    return argv
+
+
+def read_report(tmp_path):
+    with open(tmp_path / 'report.json') as f:
+        return json.load(f)
+
+
+def prometheus_failures(tmp_path):
+    with open(tmp_path / 'scrapepl.prom') as f:
+        return next(line for line in f if line.startswith('scrapepl_run_failures ')).split()[1]
+
+
+def test_run(argv, tmp_path):
+    assert cli.main(argv) == 0
+
+    assert read_report(tmp_path)['failures'] == []
+    assert prometheus_failures(tmp_path) == '0'
+    assert pd.read_sql_table('players_fpl', f'sqlite:///{tmp_path / "test.db"}')['web_name'].tolist() == ['Salah']
+    assert (tmp_path / 'hashes.json').exists()
+
+
+def test_failed_load_and_snapshot_are_reported(argv, tmp_path):
+    (tmp_path / 'not_a_directory').write_text('')
+    argv = option(argv, '--db-url', f'sqlite:///{tmp_path / "missing" / "test.db"}')
+    argv = option(argv, '--snapshot-dir', str(tmp_path / 'not_a_directory'))
+
+    assert cli.main(argv) == 1
+
+    assert [failure['stage'] for failure in read_report(tmp_path)['failures']] == ['load', 'snapshot']
+    assert prometheus_failures(tmp_path) == '2'
+    # Nothing was loaded, so the next run has to load it again
+    assert not (tmp_path / 'hashes.json').exists()
+
+
+def test_report_is_written_when_the_run_fails(argv, tmp_path, monkeypatch):
+    def broken(payload, columns=None):
+        raise KeyError('elements')
+    monkeypatch.setattr(fpl, 'players_frame', broken)
+
+    with pytest.raises(KeyError):
+        cli.main(argv)
+
+    assert [failure['stage'] for failure in read_report(tmp_path)['failures']] == ['run']
+    assert prometheus_failures(tmp_path) == '1'
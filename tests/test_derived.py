@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scrapepl import derived, fbref
+
+FACTS = pd.DataFrame({
+    'Player': ['Mohamed Salah', 'Sadio Mané', 'Harry Kane', 'Lucas Moura'],
+    'Squad': ['Liverpool', 'Liverpool', 'Tottenham', 'Tottenham'],
+    'Goals': pd.array([23, 16, 17, 0], dtype='Int32'),
+    'Assists': pd.array([13, 2, 9, 3], dtype='Int32'),
+    'Penalties': pd.array([5, 0, 4, 0], dtype='Int32'),
+    'ShotsTotal': pd.array([139, 84, 109, 0], dtype='Int32'),
+    'Min': pd.array([2762, 2822, 3137, 1180], dtype='Int32'),
+    '90s': np.array([30.7, 31.4, 34.9, 13.1], dtype='float32'),
+    'xG': np.array([24.2, 17.0, 22.7, 1.9], dtype='float32'),
+    'npxG': np.array([19.5, 17.0, 18.8, 1.9], dtype='float32'),
+    'xA': np.array([14.2, 4.9, 9.0, 2.4], dtype='float32'),
+    'xTeamGConPitch': np.array([19.1, 21.3, 28.7, 12.3], dtype='float32'),
+})
+FACTS.insert(0, 'player_key', fbref.player_key(FACTS['Player']))
+TEAMS = pd.DataFrame({
+    'Team': ['Liverpool', 'Tottenham'],
+    'Goals': pd.array([94, 69], dtype='Int32'),
+    # One Tottenham assist went to a player who has since left
+    'Assists': pd.array([15, 13], dtype='Int32'),
+    'Penalties': pd.array([5, 4], dtype='Int32'),
+    'xG': np.array([41.2, 24.6], dtype='float32'),
+    'npxG': np.array([36.5, 20.7], dtype='float32'),
+    'xA': np.array([19.1, 11.4], dtype='float32'),
+})
+# As transform gives the squads-against table: every row is labelled 'vs <team>'
+OPPONENTS = pd.DataFrame({
+    'Team': ['vs Liverpool', 'vs Tottenham'],
+    'Goals': pd.array([26, 40], dtype='Int32'),
+    'xGc': np.array([32.0, 41.0], dtype='float32'),
+})
+
+
+def test_derive_shares():
+    result = derived.derive(FACTS, TEAMS, OPPONENTS)
+
+    assert result[['player_key', 'Player', 'Squad']].equals(FACTS[['player_key', 'Player', 'Squad']])
+    assert result['GoalShare'].tolist() == pytest.approx([0.245, 0.170, 0.246, 0.0], abs=1e-3)
+    assert result['ShotShare'].tolist() == pytest.approx([0.623, 0.377, 1.0, 0.0], abs=1e-3)
+    assert result['xGShare'].dtype == np.float32
+
+
+def test_derive_matches_opponent_rows_to_squads():
+    result = derived.derive(FACTS, TEAMS, OPPONENTS)
+
+    assert result['TeamxGcWhileOnPitch'].notna().all()
+    assert result['TeamxGcWhileOnPitch'].tolist() == pytest.approx([0.597, 0.666, 0.7, 0.3], abs=1e-3)
+
+
+def test_derive_gives_null_for_division_by_zero():
+    result = derived.derive(FACTS, TEAMS, OPPONENTS)
+
+    # Lucas had no shots
+    assert np.isnan(result.loc[3, 'xGPerShot'])
+    assert np.isfinite(result.loc[:2, 'xGPerShot']).all()
+
+
+def test_derive_failures():
+    metrics = {'Goals90': 'Goals / `90s`', 'Broken': 'Goals / NoSuchColumn'}
+
+    with pytest.raises(Exception):
+        derived.derive(FACTS, TEAMS, OPPONENTS, metrics=metrics)
+
+    failures = {}
+    result = derived.derive(FACTS, TEAMS, OPPONENTS, metrics=metrics, failures=failures)
+    assert 'Goals90' in result.columns and 'Broken' not in result.columns
+    assert list(failures) == ['Broken']
+
+
+def test_reconcile():
+    result = derived.reconcile(FACTS, TEAMS).set_index(['Team', 'stat'])
+
+    # Player xG sums within the rounding of two players, exact stats must match exactly
+    assert result.loc[('Liverpool', 'xG'), 'reconciled']
+    assert result.loc[('Liverpool', 'xG'), 'tolerance'] == pytest.approx(0.1)
+    assert not result.loc[('Tottenham', 'Assists'), 'reconciled']
+    assert result.loc[('Tottenham', 'Assists'), 'difference'] == -1
+    assert result.loc[('Liverpool', 'Penalties'), 'reconciled']
+    assert result.loc[('Liverpool', 'Penalties'), 'tolerance'] == 0
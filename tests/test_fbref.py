@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scrapepl import fbref
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+@pytest.fixture
+def html():
+    with open(os.path.join(FIXTURES, 'stats_standard.html'), 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def spec():
+    return next(spec for spec in fbref.TABLE_SPECS if spec.name == 'playerstandard')
+
+
+def test_extract_table_finds_commented_out_table(html):
+    table = fbref.extract_table(html, 'stats_standard')
+
+    assert table.startswith('<table') and table.endswith('</table>')
+    assert '<!--' not in table and '-->' not in table
+    with pytest.raises(ValueError):
+        fbref.extract_table(html, 'stats_keeper')
+
+
+def test_transform_drops_header_rows_and_transfer_duplicates(html, spec):
+    df = fbref.transform(spec, fbref.read_table(html, spec.table_id))
+
+    assert df['Player'].tolist() == ['Mohamed Salah', 'Harry Kane', 'Ben White']
+    # The first club listed is kept
+    assert df['Squad'].tolist() == ['Liverpool', 'Tottenham', 'Arsenal']
+    assert isinstance(df.index, pd.RangeIndex)
+
+
+def test_transform_renames_and_splits_per_90_columns(html, spec):
+    df = fbref.transform(spec, fbref.read_table(html, spec.table_id))
+
+    assert not {'Rk', 'Born', 'Matches'} & set(df.columns)
+    assert df.loc[0, ['Goals', 'Assists', 'npGoals', 'Penalties']].tolist() == [23, 13, 18, 5]
+    assert df.loc[0, ['G90', 'A90', 'xG90', 'xA90']].astype(float).round(2).tolist() == [0.75, 0.42, 0.79, 0.46]
+
+
+def test_transform_coerces_stats(html, spec):
+    df = fbref.transform(spec, fbref.read_table(html, spec.table_id))
+
+    assert df['Min'].tolist() == [2762, 3137, 2880]
+    assert df['Min'].dtype == 'Int32' and df['Goals'].dtype == 'Int32'
+    assert df['xG'].dtype == np.float32 and df['90s'].dtype == np.float32
+    assert df['Age'].tolist() == ['29-120', '28-178', '24-120']
+    # Blank cells are missing, not zero
+    assert df['xA'].isna().tolist() == [False, False, True]
+
+
+@pytest.mark.parametrize('name, values, dtype, expected', [
+    ('Min', ['1,234', '90', None], 'Int32', [1234, 90, pd.NA]),
+    ('Gls', [0, 1, 2], 'Int32', [0, 1, 2]),
+    ('Cmp%', ['81.5', '', '90'], 'float32', [81.5, np.nan, 90.0]),
+    ('xG', ['1', '2', '3'], 'float32', [1.0, 2.0, 3.0]),
+    # A count with fractions isn't a count
+    ('Dist', ['17.4', '18', '19'], 'float32', [17.4, 18.0, 19.0]),
+])
+def test_coerce_stat(name, values, dtype, expected):
+    result = fbref.coerce_stat(name, pd.Series(values, dtype=object))
+
+    assert result.dtype == dtype
+    pd.testing.assert_series_equal(result, pd.Series(expected, dtype=dtype), check_names=False)
+
+
+def test_coerce_keeps_text_columns():
+    df = fbref.coerce(pd.DataFrame({'Player': ['Kane'], 'Squad': ['Tottenham'], 'Gls': ['17']}))
+
+    assert df['Player'].tolist() == ['Kane'] and df['Squad'].tolist() == ['Tottenham']
+    assert df['Gls'].dtype == 'Int32'
@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from scrapepl import fetch, httpcache
+
+
+class Server:
+    """A local HTTP server whose routes count the requests they get."""
+
+    def __init__(self):
+        self.hits = {}
+        self.app = web.Application()
+        self.app.router.add_get('/flaky', self.flaky)
+        self.app.router.add_get('/etag', self.etag)
+        self.app.router.add_get('/down', self.down)
+        self.app.router.add_get('/missing', self.missing)
+
+    def _hit(self, request):
+        self.hits[request.path] = self.hits.get(request.path, 0) + 1
+        return self.hits[request.path]
+
+    async def flaky(self, request):
+        if self._hit(request) == 1:
+            return web.Response(status=429, headers={'Retry-After': '1'})
+        return web.Response(body=b'{"ok": true}')
+
+    async def etag(self, request):
+        self._hit(request)
+        if request.headers.get('If-None-Match') == '"v1"':
+            return web.Response(status=304)
+        return web.Response(body=b'first', headers={'ETag': '"v1"'})
+
+    async def down(self, request):
+        self._hit(request)
+        return web.Response(status=503)
+
+    async def missing(self, request):
+        self._hit(request)
+        return web.Response(status=404)
+
+
+def serve(test, **fetcher_options):
+    """Run ``test(fetcher, server, url)`` against a fresh local server."""
+    async def main():
+        server = Server()
+        runner = web.AppRunner(server.app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', 0).start()
+        port = runner.addresses[0][1]
+        try:
+            async with aiohttp.ClientSession() as session:
+                fetcher = fetch.Fetcher(session, **{'backoff': 0.01, **fetcher_options})
+                return await test(fetcher, server, lambda path: f'http://127.0.0.1:{port}{path}')
+        finally:
+            await runner.cleanup()
+    return asyncio.run(main())
+
+
+def test_retries_429_after_retry_after():
+    async def test(fetcher, server, url):
+        started = time.perf_counter()
+        assert await fetcher.json(url('/flaky')) == {'ok': True}
+        return time.perf_counter() - started, server.hits['/flaky']
+
+    seconds, hits = serve(test)
+
+    assert hits == 2
+    # The backoff alone would be a few milliseconds
+    assert seconds >= 0.9
+
+
+def test_client_errors_are_not_retried():
+    async def test(fetcher, server, url):
+        with pytest.raises(aiohttp.ClientResponseError) as error:
+            await fetcher.read(url('/missing'))
+        return error.value.status, server.hits['/missing']
+
+    assert serve(test) == (404, 1)
+
+
+def test_304_is_answered_from_the_cache(tmp_path):
+    cache = httpcache.ResponseCache(str(tmp_path))
+
+    async def test(fetcher, server, url):
+        first = await fetcher.read(url('/etag'))
+        downloaded = dict(fetcher.downloaded)
+        fetcher.downloaded.clear()
+        second = await fetcher.read(url('/etag'))
+        return first, second, downloaded, fetcher.downloaded, server.hits['/etag']
+
+    first, second, downloaded, redownloaded, hits = serve(test, cache=cache)
+
+    assert first == second == b'first'
+    assert list(downloaded.values()) == [5]
+    assert redownloaded == {}
+    assert hits == 2
+    assert cache.get(next(iter(downloaded))).etag == '"v1"'
+
+
+def test_circuit_opens_after_repeated_failures():
+    async def test(fetcher, server, url):
+        for _ in range(fetch.BREAKER_THRESHOLD):
+            with pytest.raises(aiohttp.ClientResponseError):
+                await fetcher.read(url('/down'))
+        with pytest.raises(fetch.CircuitOpenError):
+            await fetcher.read(url('/down'))
+        return server.hits['/down']
+
+    assert serve(test, retries=0) == fetch.BREAKER_THRESHOLD
+
+
+def test_offline_serves_only_the_cache(tmp_path):
+    cache = httpcache.ResponseCache(str(tmp_path))
+
+    async def test(fetcher, server, url):
+        cache.put(url('/etag'), b'cached')
+        assert await fetcher.read(url('/etag')) == b'cached'
+        with pytest.raises(LookupError):
+            await fetcher.read(url('/missing'))
+        return server.hits
+
+    assert serve(test, cache=cache, offline=True) == {}
+
+
+def test_offline_needs_a_cache():
+    async def test(fetcher, server, url):
+        pass
+
+    with pytest.raises(ValueError):
+        serve(test, offline=True)
+
+
+@pytest.mark.parametrize('value, expected', [('3', 3.0), ('-1', 0.0), ('Wed, 21 Oct 2015 07:28:00 GMT', 0.0),
+                                             ('soon', None), (None, None)])
+def test_retry_after(value, expected):
+    error = aiohttp.ClientResponseError(None, (), status=429, headers={'Retry-After': value} if value else {})
+
+    assert fetch.retry_after(error) == expected
@@ -0,0 +1,55 @@
+import pandas as pd
+
+from scrapepl import fpl
+
+PAYLOAD = {
+    'elements': [
+        {'id': 1, 'element_type': 3, 'first_name': 'Mohamed', 'second_name': 'Salah', 'photo': '118748.jpg',
+         'team': 2, 'web_name': 'Salah', 'points_per_game': '8.7', 'now_cost': 130, 'clean_sheets': 12,
+         'status': 'a', 'form': '10.5', 'chance_of_playing_next_round': None},
+        {'id': 2, 'element_type': 4, 'first_name': 'Harry', 'second_name': 'Kane', 'photo': '78830.jpg',
+         'team': 1, 'web_name': 'Kane', 'points_per_game': '5.9', 'now_cost': 125, 'clean_sheets': 10,
+         'status': 'd', 'form': '3.0', 'chance_of_playing_next_round': 75},
+    ],
+    'element_types': [{'id': 1, 'plural_name_short': 'GKP'}, {'id': 2, 'plural_name_short': 'DEF'},
+                      {'id': 3, 'plural_name_short': 'MID'}, {'id': 4, 'plural_name_short': 'FWD'}],
+    'teams': [{'id': 1, 'name': 'Spurs'}, {'id': 2, 'name': 'Liverpool'}],
+}
+
+
+def test_players_frame():
+    df = fpl.players_frame(PAYLOAD)
+
+    assert list(df.columns) == fpl.FPL_COLUMNS + ['player', 'position', 'team_name']
+    assert df['player'].tolist() == ['Mohamed Salah', 'Harry Kane']
+    assert df['position'].tolist() == ['MID', 'FWD']
+    assert df['team_name'].tolist() == ['Liverpool', 'Spurs']
+    # Prices come in tenths of a million
+    assert df['now_cost'].tolist() == [13.0, 12.5]
+
+
+def test_players_frame_dtypes():
+    df = fpl.players_frame(PAYLOAD)
+
+    assert df['id'].dtype == 'int16' and df['element_type'].dtype == 'int8'
+    assert df['points_per_game'].dtype == 'float32' and df['now_cost'].dtype == 'float32'
+    assert isinstance(df['position'].dtype, pd.CategoricalDtype)
+    assert list(df['position'].cat.categories) == ['GKP', 'DEF', 'MID', 'FWD']
+
+
+def test_players_frame_extra_columns():
+    df = fpl.players_frame(PAYLOAD, columns=['status', 'chance_of_playing_next_round'])
+
+    assert isinstance(df['status'].dtype, pd.CategoricalDtype)
+    assert df['chance_of_playing_next_round'].dtype == 'Int8'
+    assert df['chance_of_playing_next_round'].isna().tolist() == [True, False]
+
+    every = fpl.players_frame(PAYLOAD, columns='all')
+    assert every['form'].tolist() == [10.5, 3.0]
+
+
+def test_players_frame_without_players():
+    df = fpl.players_frame({**PAYLOAD, 'elements': []})
+
+    assert len(df) == 0
+    assert list(df.columns) == fpl.FPL_COLUMNS + ['player', 'position', 'team_name']
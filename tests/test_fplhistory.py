@@ -0,0 +1,76 @@
+import asyncio
+import json
+import os
+
+import pandas as pd
+
+from scrapepl import fplhistory, httpcache
+
+
+def history(element, rounds):
+    """element-summary ``history`` rows, every field 0 unless set here."""
+    return [{**dict.fromkeys(fplhistory.HISTORY_COLUMNS, 0), 'element': element, 'fixture': 10 * element + round_,
+             'round': round_, 'kickoff_time': f'2021-08-{13 + round_:02d}T19:00:00Z', 'opponent_team': round_,
+             'was_home': round_ % 2 == 1, 'team_h_score': 1, 'team_a_score': None, 'minutes': 90, 'value': 125,
+             'selected': 2500000, 'influence': '12.4'} for round_ in rounds]
+
+
+def cached(tmp_path, histories):
+    cache = httpcache.ResponseCache(str(tmp_path / 'cache'))
+    for element, rows in histories.items():
+        cache.put(fplhistory.ELEMENT_SUMMARY_URL.format(id=element), json.dumps({'history': rows}).encode())
+    return cache
+
+
+def test_history_frame():
+    df = fplhistory.history_frame(2021, [history(1, [1, 2]), history(2, [1])])
+
+    assert list(df.columns) == ['season'] + fplhistory.HISTORY_COLUMNS
+    assert df[['season', 'element', 'round']].values.tolist() == [[2021, 1, 1], [2021, 1, 2], [2021, 2, 1]]
+    assert df['element'].dtype == 'int16' and df['team_a_score'].dtype == 'Int8'
+    assert df['was_home'].tolist() == [True, False, True]
+    # Stored as naive UTC
+    assert df['kickoff_time'].tolist() == [pd.Timestamp('2021-08-14 19:00'), pd.Timestamp('2021-08-15 19:00'),
+                                           pd.Timestamp('2021-08-14 19:00')]
+    assert df['influence'].dtype == 'float32'
+
+
+def test_load_history(engine, tmp_path):
+    cache = cached(tmp_path, {1: history(1, [1, 2]), 2: history(2, [1, 2]), 3: []})
+    checkpoint = str(tmp_path / 'history.json')
+
+    summary = asyncio.run(fplhistory.load_history(engine, [1, 2, 3], 2021, 2, cache=cache, offline=True,
+                                                  checkpoint_path=checkpoint))
+
+    assert summary['players'] == 3 and summary['rows'] == 4
+    stored = pd.read_sql_table(fplhistory.HISTORY_TABLE, engine)
+    assert sorted(stored['fixture']) == [11, 12, 21, 22]
+    # A finished gameweek leaves no checkpoint behind
+    assert not os.path.exists(checkpoint)
+
+
+def test_load_history_skips_players_in_the_checkpoint(engine, tmp_path):
+    cache = cached(tmp_path, {1: history(1, [1]), 2: history(2, [1])})
+    checkpoint = str(tmp_path / 'history.json')
+    fplhistory.Checkpoint(checkpoint, '2021-1').add([1])
+
+    summary = asyncio.run(fplhistory.load_history(engine, [1, 2], 2021, 1, cache=cache, offline=True,
+                                                  checkpoint_path=checkpoint))
+
+    assert summary['players'] == 1
+    assert pd.read_sql_table(fplhistory.HISTORY_TABLE, engine)['element'].tolist() == [2]
+
+
+def test_load_history_failures(engine, tmp_path):
+    # Player 2 isn't in the cache, so offline it can't be fetched
+    cache = cached(tmp_path, {1: history(1, [1])})
+    checkpoint = str(tmp_path / 'history.json')
+    failures = {}
+
+    summary = asyncio.run(fplhistory.load_history(engine, [1, 2], 2021, 1, cache=cache, offline=True,
+                                                  checkpoint_path=checkpoint, failures=failures))
+
+    assert list(failures) == [2]
+    assert summary['rows'] == 1
+    # The checkpoint is kept so the next run only has to fetch player 2
+    assert fplhistory.Checkpoint(checkpoint, '2021-1').done == {1}
@@ -0,0 +1,59 @@
+import os
+import time
+
+from scrapepl import httpcache
+
+
+def objects(cache):
+    return os.listdir(os.path.join(cache.directory, 'objects'))
+
+
+def test_put_and_get(tmp_path):
+    cache = httpcache.ResponseCache(str(tmp_path))
+
+    cache.put('https://example.com/a', b'body', etag='"v1"', last_modified='Sat, 18 Sep 2021 10:00:00 GMT')
+
+    cached = cache.get('https://example.com/a')
+    assert (cached.body, cached.etag, cached.last_modified) == (b'body', '"v1"', 'Sat, 18 Sep 2021 10:00:00 GMT')
+    assert cache.get('https://example.com/b') is None
+
+
+def test_identical_bodies_are_stored_once(tmp_path):
+    cache = httpcache.ResponseCache(str(tmp_path))
+
+    cache.put('https://example.com/a', b'same')
+    cache.put('https://example.com/b', b'same')
+
+    assert len(objects(cache)) == 1
+    assert cache.get('https://example.com/b').body == b'same'
+
+
+def test_prune_drops_expired_entries(tmp_path):
+    cache = httpcache.ResponseCache(str(tmp_path), ttl=60)
+    cache.put('https://example.com/old', b'old')
+    cache.put('https://example.com/new', b'new')
+    path = cache._index_path('https://example.com/old')
+    record = cache._read_record(path)
+    record['stored'] = time.time() - 120
+    cache._write_record(path, record)
+
+    cache.prune()
+
+    assert cache.get('https://example.com/old') is None
+    assert cache.get('https://example.com/new').body == b'new'
+    assert len(objects(cache)) == 1
+
+
+def test_prune_evicts_least_recently_used_over_max_bytes(tmp_path):
+    cache = httpcache.ResponseCache(str(tmp_path), max_bytes=10)
+    cache.put('https://example.com/a', b'aaaaaa')
+    cache.put('https://example.com/b', b'bbbbbb')
+    path = cache._index_path('https://example.com/a')
+    record = cache._read_record(path)
+    record['accessed'] = time.time() - 60
+    cache._write_record(path, record)
+
+    cache.prune()
+
+    assert cache.get('https://example.com/a') is None
+    assert cache.get('https://example.com/b').body == b'bbbbbb'
@@ -0,0 +1,138 @@
+import pandas as pd
+import pytest
+import sqlalchemy
+
+from scrapepl import loader
+
+
+def players(rows):
+    return pd.DataFrame(rows, columns=['Player', 'Squad', 'Goals', 'xG']).astype({'Goals': 'Int32', 'xG': 'float32'})
+
+
+def read(engine, table):
+    return pd.read_sql_table(table, engine).sort_values(['Player', 'Squad']).reset_index(drop=True)
+
+
+def tables(engine):
+    return set(sqlalchemy.inspect(engine).get_table_names())
+
+
+def test_upsert_creates_table_with_primary_key(engine):
+    result = loader.upsert(engine, players([('Kane', 'Spurs', 23, 22.1), ('Salah', 'Liverpool', 22, 20.5)]),
+                           'playerstandard', ['Player', 'Squad'])
+
+    assert (result.rows, result.written, result.deleted) == (2, 2, 0)
+    assert sqlalchemy.inspect(engine).get_pk_constraint('playerstandard')['constrained_columns'] == ['Player', 'Squad']
+    stored = read(engine, 'playerstandard')
+    assert stored['Player'].tolist() == ['Kane', 'Salah']
+    assert stored['Goals'].tolist() == [23, 22]
+
+
+def test_upsert_writes_only_changed_rows_and_deletes_stale_keys(engine):
+    loader.upsert(engine, players([('Kane', 'Spurs', 23, 22.1), ('Salah', 'Liverpool', 22, 20.5),
+                                   ('Vardy', 'Leicester', 15, 17.0)]), 'playerstandard', ['Player', 'Squad'])
+
+    result = loader.upsert(engine, players([('Kane', 'Spurs', 24, 22.9), ('Salah', 'Liverpool', 22, 20.5),
+                                            ('Son', 'Spurs', 17, 11.5)]), 'playerstandard', ['Player', 'Squad'])
+
+    assert (result.rows, result.written, result.deleted) == (3, 2, 1)
+    stored = read(engine, 'playerstandard')
+    assert stored['Player'].tolist() == ['Kane', 'Salah', 'Son']
+    assert stored['Goals'].tolist() == [24, 22, 17]
+
+
+def test_upsert_stores_missing_values_as_null(engine):
+    loader.upsert(engine, players([('Kane', 'Spurs', pd.NA, None)]), 'playerstandard', ['Player', 'Squad'])
+
+    stored = read(engine, 'playerstandard')
+    assert stored['Goals'].isna().all() and stored['xG'].isna().all()
+
+
+def test_upsert_recreates_table_without_primary_key(engine):
+    players([('Kane', 'Spurs', 23, 22.1)]).to_sql('playerstandard', engine, index=False)
+
+    loader.upsert(engine, players([('Salah', 'Liverpool', 22, 20.5)]), 'playerstandard', ['Player', 'Squad'])
+
+    assert sqlalchemy.inspect(engine).get_pk_constraint('playerstandard')['constrained_columns'] == ['Player', 'Squad']
+    assert read(engine, 'playerstandard')['Player'].tolist() == ['Salah']
+
+
+def test_multirow_writer_splits_into_chunks(engine):
+    df = players([(f'Player {i}', 'Spurs', i, i / 10) for i in range(25)])
+
+    result = loader.upsert(engine, df, 'playerstandard', ['Player', 'Squad'],
+                           writer=loader.MultiRowInsertWriter(chunksize=10))
+
+    assert result.writer == 'multirow'
+    assert len(read(engine, 'playerstandard')) == 25
+
+
+class BrokenWriter:
+    name = 'broken'
+
+    def write(self, conn, sql_table, keys, df):
+        conn.execute(sqlalchemy.text('SELECT * FROM no_such_table'))
+
+
+def test_fallback_writer_drops_a_failing_writer(engine):
+    writer = loader.FallbackWriter(BrokenWriter(), loader.MultiRowInsertWriter())
+
+    result = loader.upsert(engine, players([('Kane', 'Spurs', 23, 22.1)]), 'playerstandard', ['Player', 'Squad'],
+                           writer=writer)
+
+    assert result.writer == 'multirow'
+    assert read(engine, 'playerstandard')['Player'].tolist() == ['Kane']
+
+
+def test_append_keeps_existing_rows_and_adds_columns(engine):
+    first = pd.DataFrame({'season': [2020], 'Player': ['Kane'], 'Goals': [23]})
+    second = pd.DataFrame({'season': [2021, 2021], 'Player': ['Kane', 'Salah'], 'Goals': [17, 23], 'xG': [16.6, 20.1]})
+
+    loader.append(engine, first, 'playerstandard_history', ('season', 'Player'))
+    loader.append(engine, second, 'playerstandard_history', ('season', 'Player'), add_columns=True)
+
+    stored = pd.read_sql_table('playerstandard_history', engine).sort_values(['season', 'Player'])
+    assert stored[['season', 'Player', 'Goals']].values.tolist() == [[2020, 'Kane', 23], [2021, 'Kane', 17],
+                                                                      [2021, 'Salah', 23]]
+    assert stored['xG'].isna().tolist() == [True, False, False]
+
+
+def test_staged_load_publishes_all_tables_at_once(engine):
+    with loader.StagedLoad(engine) as staged:
+        staged.upsert(players([('Kane', 'Spurs', 23, 22.1)]), 'playerstandard', ['Player', 'Squad'])
+        staged.upsert(players([('Salah', 'Liverpool', 22, 20.5)]), 'playersShooting', ['Player', 'Squad'])
+        # Nothing is live until publish
+        assert tables(engine) == {'playerstandard__staging', 'playersShooting__staging'}
+
+    assert tables(engine) == {'playerstandard', 'playersShooting'}
+    assert [result.table for result in staged.results] == ['playerstandard', 'playersShooting']
+
+
+def test_staged_load_writes_only_changes_to_live_tables(engine):
+    with loader.StagedLoad(engine) as staged:
+        staged.upsert(players([('Kane', 'Spurs', 23, 22.1), ('Salah', 'Liverpool', 22, 20.5),
+                               ('Vardy', 'Leicester', 15, 17.0)]), 'playerstandard', ['Player', 'Squad'],
+                      indexes=[('Squad',)])
+
+    with loader.StagedLoad(engine) as staged:
+        result = staged.upsert(players([('Kane', 'Spurs', 24, 22.9), ('Salah', 'Liverpool', 22, 20.5)]),
+                               'playerstandard', ['Player', 'Squad'], indexes=[('Squad',)])
+
+    assert (result.written, result.deleted) == (1, 1)
+    stored = read(engine, 'playerstandard')
+    assert stored['Player'].tolist() == ['Kane', 'Salah']
+    assert stored['Goals'].tolist() == [24, 22]
+    indexes = sqlalchemy.inspect(engine).get_indexes('playerstandard')
+    assert [index['name'] for index in indexes] == [loader.index_name('playerstandard', ['Squad'])]
+
+
+def test_staged_load_discards_on_error(engine):
+    loader.upsert(engine, players([('Kane', 'Spurs', 23, 22.1)]), 'playerstandard', ['Player', 'Squad'])
+
+    with pytest.raises(RuntimeError):
+        with loader.StagedLoad(engine) as staged:
+            staged.upsert(players([('Salah', 'Liverpool', 22, 20.5)]), 'playerstandard', ['Player', 'Squad'])
+            raise RuntimeError("transform failed")
+
+    assert tables(engine) == {'playerstandard'}
+    assert read(engine, 'playerstandard')['Player'].tolist() == ['Kane']
@@ -0,0 +1,97 @@
+import pandas as pd
+
+from scrapepl import loader, playernames
+
+FPL = pd.DataFrame({
+    'id': [1, 2, 3, 4],
+    'player': ['Son Heung-min', 'Mohamed Salah', 'Martin Ødegaard', 'Ben White'],
+    'web_name': ['Son', 'Salah', 'Ødegaard', 'White'],
+    'team_name': ['Spurs', 'Liverpool', 'Arsenal', 'Arsenal'],
+    'position': ['MID', 'MID', 'MID', 'DEF'],
+})
+UNDERSTAT = pd.DataFrame({
+    'id': ['453', '1250', '7700', '8000'],
+    'player_name': ['Son Heung-Min', 'Mohamed Salah', 'Martin Odegaard', 'Ben White'],
+    # Ødegaard moved mid-season and is listed under both clubs
+    'team_title': ['Tottenham', 'Liverpool', 'Real Madrid,Arsenal', 'Brighton'],
+    'position': ['F M', 'F M', 'M', 'D'],
+})
+FBREF = pd.DataFrame({
+    'Player': ['Heung-min Son', 'Mohamed Salah', 'Martin Ødegaard', 'Benjamin White'],
+    'Squad': ['Tottenham', 'Liverpool', 'Arsenal', 'Arsenal'],
+    'Pos': ['FW,MF', 'FW', 'MF', 'DF'],
+})
+# A new FPL player none of the sources have yet
+KANE = pd.DataFrame({'id': [5], 'player': ['Harry Kane'], 'web_name': ['Kane'], 'team_name': ['Spurs'],
+                     'position': ['FWD']})
+
+
+def test_fold_and_name_key():
+    assert playernames.fold(pd.Series(['Martin Ødegaard', 'N\'Golo Kanté'])).tolist() == ['martin odegaard',
+                                                                                         'n golo kante']
+    assert playernames.name_key(pd.Series(['Son Heung-min', 'Heung-Min Son'])).nunique() == 1
+
+
+def test_build_player_map():
+    result = playernames.build_player_map(FPL, UNDERSTAT, FBREF).set_index('fpl_id')
+
+    assert result['player_id'].tolist() == [1, 2, 3, 4]
+    assert result['understat_id'].tolist() == ['453', '1250', '7700', '8000']
+    # White's Understat row is under his previous club, so only his name can match it
+    assert result['understat_method'].tolist() == ['exact_team', 'exact_team', 'exact_team', 'exact_name']
+    assert result['fbref_player'].tolist() == FBREF['Player'].tolist()
+    assert result['fbref_squad'].tolist() == FBREF['Squad'].tolist()
+    assert result.loc[4, 'fbref_method'] == 'fuzzy'
+
+
+def test_build_player_map_keeps_previous_matches():
+    previous = playernames.build_player_map(FPL, UNDERSTAT, FBREF)
+    previous.loc[previous['fpl_id'] == 4, 'understat_method'] = 'manual'
+    fpl = pd.concat([FPL, KANE], ignore_index=True)
+
+    result = playernames.build_player_map(fpl, UNDERSTAT, FBREF, previous=previous).set_index('fpl_id')
+
+    assert result.loc[4, 'understat_method'] == 'manual'
+    # A new player gets the next id and stays unmatched when no source has them
+    assert result.loc[5, 'player_id'] == 5
+    assert pd.isna(result.loc[5, 'understat_id']) and pd.isna(result.loc[5, 'fbref_player'])
+
+
+def test_build_player_map_drops_matches_whose_source_row_is_gone():
+    previous = playernames.build_player_map(FPL, UNDERSTAT, FBREF)
+
+    result = playernames.build_player_map(FPL, UNDERSTAT[UNDERSTAT['id'] != '1250'], FBREF,
+                                          previous=previous).set_index('fpl_id')
+
+    assert pd.isna(result.loc[2, 'understat_id'])
+    assert result.loc[2, 'player_id'] == 2
+
+
+def test_build_player_map_never_reuses_ids():
+    previous = playernames.build_player_map(FPL, UNDERSTAT, FBREF)
+    # White, who has the highest id, leaves as Kane joins
+    fpl = pd.concat([FPL[FPL['id'] != 4], KANE], ignore_index=True)
+
+    result = playernames.build_player_map(fpl, UNDERSTAT, FBREF, previous=previous).set_index('fpl_id')
+
+    assert result['player_id'].tolist() == [1, 2, 3, 5]
+
+
+def test_last_player_id_outlives_the_map(engine):
+    first = playernames.build_player_map(FPL, UNDERSTAT, FBREF)
+    loader.upsert(engine, first, playernames.MAP_TABLE, ['player_id'])
+    loader.upsert(engine, playernames.last_id_frame(first), playernames.LAST_ID_TABLE, ['sequence'])
+    # White leaves: the stored map drops him, the last id stays 4
+    second = playernames.build_player_map(FPL[FPL['id'] != 4], UNDERSTAT, FBREF,
+                                          previous=playernames.read_player_map(engine),
+                                          last_id=playernames.read_last_player_id(engine))
+    loader.upsert(engine, second, playernames.MAP_TABLE, ['player_id'])
+    loader.upsert(engine, playernames.last_id_frame(second, playernames.read_last_player_id(engine)),
+                  playernames.LAST_ID_TABLE, ['sequence'])
+    fpl = pd.concat([FPL[FPL['id'] != 4], KANE], ignore_index=True)
+
+    third = playernames.build_player_map(fpl, UNDERSTAT, FBREF, previous=playernames.read_player_map(engine),
+                                         last_id=playernames.read_last_player_id(engine)).set_index('fpl_id')
+
+    assert playernames.read_last_player_id(engine) == 4
+    assert third.loc[5, 'player_id'] == 5
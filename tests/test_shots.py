@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+import pandas as pd
+from understat.constants import LEAGUE_URL, MATCH_URL
+
+from scrapepl import httpcache, shots
+
+
+def shot(shot_id, match_id, side):
+    return {'id': str(shot_id), 'match_id': str(match_id), 'season': '2021', 'date': '2021-08-14 14:00:00',
+            'minute': '12', 'h_a': side, 'h_team': 'Arsenal', 'a_team': 'Chelsea', 'h_goals': '0', 'a_goals': '2',
+            'player_id': '1250', 'player': 'Romelu Lukaku', 'player_assisted': None, 'situation': 'OpenPlay',
+            'shotType': 'Head', 'lastAction': 'Cross', 'result': 'Goal', 'X': '0.9', 'Y': '0.52', 'xG': '0.31'}
+
+
+def cached(tmp_path, matches):
+    """A cache holding the 2021 EPL results and the shots of ``matches`` (id -> number of shots per side)."""
+    cache = httpcache.ResponseCache(str(tmp_path / 'cache'))
+    dates = [{'id': str(match_id), 'isResult': True} for match_id in matches]
+    cache.put(LEAGUE_URL.format('EPL', 2021), json.dumps({'dates': dates + [{'id': '99', 'isResult': False}]}).encode())
+    for match_id, count in matches.items():
+        sides = {side: [shot(match_id * 100 + i * 2 + (side == 'a'), match_id, side) for i in range(count)]
+                 for side in ('h', 'a')}
+        cache.put(MATCH_URL.format(match_id), json.dumps({'shots': sides}).encode())
+    return cache
+
+
+def test_shots_frame():
+    df = shots.shots_frame('EPL', [shot(1, 10, 'h'), shot(2, 10, 'a')])
+
+    assert list(df.columns) == ['league'] + shots.SHOT_COLUMNS
+    assert df['id'].dtype == 'int32' and df['xG'].dtype == 'float32' and df['h_goals'].dtype == 'int8'
+    assert df['date'].tolist() == [pd.Timestamp('2021-08-14 14:00')] * 2
+
+
+def test_load_shots_skips_loaded_matches(engine, tmp_path):
+    cache = cached(tmp_path, {1: 3, 2: 2, 3: 1})
+
+    total = asyncio.run(shots.load_shots(engine, 'EPL', [2021], cache=cache, offline=True, batch_size=4))
+    again = asyncio.run(shots.load_shots(engine, 'EPL', [2021], cache=cache, offline=True))
+
+    assert (total, again) == (12, 0)
+    stored = pd.read_sql_table(shots.SHOTS_TABLE, engine)
+    assert stored.groupby('match_id').size().to_dict() == {1: 6, 2: 4, 3: 2}
+
+
+def test_load_shots_failures(engine, tmp_path):
+    cache = cached(tmp_path, {1: 1})
+    # Match 2 is a result whose shots aren't in the cache
+    cache.put(LEAGUE_URL.format('EPL', 2021), json.dumps({'dates': [{'id': '1', 'isResult': True},
+                                                                    {'id': '2', 'isResult': True}]}).encode())
+    failures = {}
+
+    total = asyncio.run(shots.load_shots(engine, 'EPL', [2021, 2020], cache=cache, offline=True, failures=failures))
+
+    assert total == 2
+    assert sorted(failures) == ['EPL/2020', 'match/2']
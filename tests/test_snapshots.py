@@ -0,0 +1,62 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scrapepl import snapshots
+
+pytest.importorskip('pyarrow')
+
+WEEK1 = datetime.date(2021, 9, 11)
+WEEK2 = datetime.date(2021, 9, 18)
+
+
+def test_compact():
+    df = snapshots.compact(pd.DataFrame({
+        'Player': ['Kane', 'Son', 'Moura', 'Kane'],
+        'Squad': ['Tottenham'] * 4,
+        'Min': ['1,0', '90', '45', '12'],
+        'Gls': np.array([1, 2, 0, 3], dtype='int64'),
+        'Touches': pd.array([3_000_000_000, None, 1, 2], dtype='Int64'),
+        'xG': np.array([0.1, 0.2, 0.3, 0.4], dtype='float64'),
+    }))
+
+    assert df['Player'].dtype == object
+    assert isinstance(df['Squad'].dtype, pd.CategoricalDtype)
+    # Not every value is a number, so it stays text
+    assert df['Min'].dtype == object
+    assert df['Gls'].dtype == 'int32'
+    assert df['Touches'].dtype == 'Int64'
+    assert df['xG'].dtype == 'float32'
+
+
+def test_write_and_read_snapshots(tmp_path):
+    directory = str(tmp_path)
+    week1 = pd.DataFrame({'Player': ['Kane', 'Son', 'Moura'], 'Squad': ['Tottenham'] * 3, 'Gls': [1, 0, 0]})
+    week2 = pd.DataFrame({'Player': ['Kane', 'Son'], 'Squad': ['Tottenham', 'Spurs'], 'Gls': [2, 1],
+                          'xG': [1.5, 0.9]})
+    snapshots.write_snapshot({'playerstandard': week1}, date=WEEK1, directory=directory)
+    snapshots.write_snapshot({'playerstandard': week2}, date=WEEK2, directory=directory)
+
+    df = snapshots.read_snapshots('playerstandard', columns=['Player', 'Squad', 'Gls', 'xG'], directory=directory)
+
+    assert list(df.columns) == ['Player', 'Squad', 'Gls', 'xG', 'date']
+    assert df['Gls'].tolist() == [1, 0, 0, 2, 1]
+    # The first week had no xG
+    assert df['xG'].isna().tolist() == [True, True, True, False, False]
+    # Categorical one week, text the next
+    assert df['Squad'].tolist() == ['Tottenham'] * 4 + ['Spurs']
+    assert df['date'].tolist() == [pd.Timestamp(WEEK1)] * 3 + [pd.Timestamp(WEEK2)] * 2
+
+
+def test_read_snapshots_between_dates(tmp_path):
+    directory = str(tmp_path)
+    for date in (WEEK1, WEEK2):
+        snapshots.write_snapshot({'teamstandard': pd.DataFrame({'Team': ['Arsenal'], 'Goals': [date.day]})},
+                                 date=date, directory=directory)
+
+    df = snapshots.read_snapshots('teamstandard', start=WEEK2, directory=directory)
+
+    assert df['Goals'].tolist() == [18]
+    assert snapshots.read_snapshots('missing', directory=directory).empty